@@ -785,17 +785,63 @@ def levenshtein_distance(s1: str, s2: str) -> int:
     return previous_row[-1]
 
 
+def _bounded_levenshtein(s1: str, s2: str, limit: int) -> int:
+    """
+    Levenshtein distance that gives up once it must exceed limit.
+    
+    Returns limit + 1 as soon as every entry of the current DP row is
+    past the limit, since no later row can bring the distance back down.
+    """
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    
+    if len(s2) == 0:
+        return len(s1)
+    
+    previous_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        append = current_row.append
+        for j, c2 in enumerate(s2):
+            cost = previous_row[j] + (c1 != c2)
+            insertion = previous_row[j + 1] + 1
+            if insertion < cost:
+                cost = insertion
+            deletion = current_row[j] + 1
+            if deletion < cost:
+                cost = deletion
+            append(cost)
+        if min(current_row) > limit:
+            return limit + 1
+        previous_row = current_row
+    
+    return previous_row[-1]
+
+
 def find_similar(name: str, candidates: List[str], max_distance: int = 3) -> List[str]:
     """Find candidates similar to the given name using Levenshtein distance."""
     similar = []
+    lowered = name.lower()
+    # The distance is at least the length difference, so those
+    # candidates can be dropped without running the DP
+    shortest = len(name) - max_distance
+    longest = len(name) + max_distance
     for candidate in candidates:
-        distance = levenshtein_distance(name.lower(), candidate.lower())
+        if not shortest <= len(candidate) <= longest:
+            continue
+        folded = candidate.lower()
+        distance = _bounded_levenshtein(lowered, folded, max_distance)
         if distance <= max_distance:
-            similar.append((distance, candidate))
+            # Among equally close names, prefer one that only adds or drops
+            # characters (NOR -> OR), then the nearest length, then the name
+            # itself, so the order never depends on how candidates arrive
+            contained = folded in lowered or lowered in folded
+            similar.append(
+                (distance, not contained, abs(len(candidate) - len(name)), candidate)
+            )
     
-    # Sort by distance and return just the names
-    similar.sort(key=lambda x: x[0])
-    return [name for _, name in similar]
+    similar.sort()
+    return [entry[-1] for entry in similar]
 
 
 def suggest_component(name: str, available: List[str]) -> Optional[str]:
@@ -5,18 +5,17 @@ Defines all AST node types for representing SHDL programs.
 """
 
 from dataclasses import dataclass, field
-from typing import Optional, TYPE_CHECKING
+from typing import Optional
 from abc import ABC
 
-if TYPE_CHECKING:
-    from ..source_map import SourceSpan
+from ..source_map import SourceSpan
 
 
 # =============================================================================
 # Base Classes
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class Node(ABC):
     """
     Base class for all AST nodes.
@@ -32,7 +31,6 @@ class Node(ABC):
     @property
     def span(self) -> "SourceSpan":
         """Get the source span for this node."""
-        from ..source_map import SourceSpan
         return SourceSpan(
             file_path=self.file_path,
             start_line=self.line,
@@ -68,7 +66,7 @@ class Node(ABC):
         return self
 
 
-@dataclass
+@dataclass(slots=True)
 class Expression(Node):
     """Base class for expression nodes."""
     pass
@@ -78,7 +76,7 @@ class Expression(Node):
 # Signal References
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class Signal(Node):
     """
     A signal reference (port or instance port).
@@ -97,7 +95,7 @@ class Signal(Node):
     index: Optional["IndexExpr"] = None  # Single index or slice
 
 
-@dataclass
+@dataclass(slots=True)
 class IndexExpr(Node):
     """
     An index expression - either a single index or a slice.
@@ -110,7 +108,7 @@ class IndexExpr(Node):
     is_slice: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class ArithmeticExpr(Node):
     """
     An arithmetic expression used in generator variable substitutions.
@@ -123,19 +121,19 @@ class ArithmeticExpr(Node):
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class NumberLiteral(ArithmeticExpr):
     """A numeric literal."""
     value: int = 0
 
 
-@dataclass 
+@dataclass(slots=True)
 class VariableRef(ArithmeticExpr):
     """A reference to a generator variable."""
     name: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class BinaryOp(ArithmeticExpr):
     """A binary arithmetic operation."""
     left: ArithmeticExpr = field(default_factory=lambda: NumberLiteral(value=0))
@@ -143,7 +141,7 @@ class BinaryOp(ArithmeticExpr):
     right: ArithmeticExpr = field(default_factory=lambda: NumberLiteral(value=0))
 
 
-@dataclass
+@dataclass(slots=True)
 class TemplateString(Node):
     """
     A template string that can include variable substitutions.
@@ -172,7 +170,7 @@ class TemplateString(Node):
 # Declarations
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class Port(Node):
     """
     A port declaration.
@@ -185,7 +183,7 @@ class Port(Node):
     width: Optional[int] = None  # None means single-bit
 
 
-@dataclass
+@dataclass(slots=True)
 class Instance(Node):
     """
     An instance declaration.
@@ -199,7 +197,7 @@ class Instance(Node):
     component_type: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class Constant(Node):
     """
     A constant declaration.
@@ -215,7 +213,7 @@ class Constant(Node):
     width: Optional[int] = None  # Explicit bit width, None means infer from value
 
 
-@dataclass
+@dataclass(slots=True)
 class Connection(Node):
     """
     A connection between signals.
@@ -232,7 +230,7 @@ class Connection(Node):
 # Generators
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class RangeSpec(Node):
     """
     A range specification in a generator.
@@ -246,26 +244,26 @@ class RangeSpec(Node):
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class SimpleRange(RangeSpec):
     """A simple range: [N] means 1 to N."""
     end: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class StartEndRange(RangeSpec):
     """A start:end range: [A:B] or [A:] or [:B]."""
     start: Optional[int] = None
     end: Optional[int] = None  # None means open-ended
 
 
-@dataclass
+@dataclass(slots=True)
 class MultiRange(RangeSpec):
     """Multiple comma-separated ranges."""
     ranges: list[RangeSpec] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class Generator(Node):
     """
     A generator construct.
@@ -278,13 +276,15 @@ class Generator(Node):
     variable: str = ""
     range_spec: RangeSpec = field(default_factory=lambda: SimpleRange(end=1))
     body: list[Node] = field(default_factory=list)  # Can contain instances, connections, or nested generators
+    # range_spec expanded to values, filled in on first use by generator_values()
+    values: Optional[tuple[int, ...]] = field(default=None, repr=False, compare=False)
 
 
 # =============================================================================
 # Imports
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class Import(Node):
     """
     An import statement.
@@ -300,13 +300,14 @@ class Import(Node):
 # Top-Level
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class ConnectBlock(Node):
     """The connect block containing all connections."""
     statements: list[Node] = field(default_factory=list)  # Connections and generators
+    has_slices: Optional[bool] = None  # Whether any statement uses a slice; None if unknown
 
 
-@dataclass
+@dataclass(slots=True)
 class Component(Node):
     """
     A component definition.
@@ -323,7 +324,7 @@ class Component(Node):
     connect_block: Optional[ConnectBlock] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Module(Node):
     """
     A complete SHDL module (file).
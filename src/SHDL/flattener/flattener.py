@@ -9,9 +9,13 @@ Transforms Expanded SHDL into Base SHDL through a multi-phase process:
 """
 
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Iterator, Optional
 from pathlib import Path
 from copy import deepcopy
+from itertools import chain
+import hashlib
+import os
+import pickle
 import re
 
 from .ast import (
@@ -22,6 +26,7 @@ from .ast import (
 )
 from .parser import parse, parse_file
 from ..errors import FlattenerError
+from ..source_map import SourceFile
 from ..semantic.analyzer import SemanticAnalyzer
 
 
@@ -29,7 +34,7 @@ from ..semantic.analyzer import SemanticAnalyzer
 # Primitive Gates
 # =============================================================================
 
-PRIMITIVE_GATES = {"AND", "OR", "NOT", "XOR", "__VCC__", "__GND__"}
+PRIMITIVE_GATES = frozenset({"AND", "OR", "NOT", "XOR", "__VCC__", "__GND__"})
 
 
 def is_primitive(component_type: str) -> bool:
@@ -41,6 +46,18 @@ def is_primitive(component_type: str) -> bool:
 # Arithmetic Expression Evaluation
 # =============================================================================
 
+# Shared literals for the bit indices the flattener generates. These nodes
+# carry no source location and are never mutated, so one per value suffices.
+_SMALL_LITERALS = [NumberLiteral(value=value) for value in range(256)]
+
+
+def number_literal(value: int) -> NumberLiteral:
+    """Get a location-less literal, shared for values in 0..255."""
+    if 0 <= value < 256:
+        return _SMALL_LITERALS[value]
+    return NumberLiteral(value=value)
+
+
 def evaluate_expr(expr: ArithmeticExpr, variables: dict[str, int]) -> int:
     """Evaluate an arithmetic expression with the given variable bindings."""
     if isinstance(expr, NumberLiteral):
@@ -94,6 +111,14 @@ def expand_range(spec: RangeSpec, max_value: Optional[int] = None) -> list[int]:
     raise FlattenerError(f"Unknown range type: {type(spec)}")
 
 
+def generator_values(gen: Generator) -> tuple[int, ...]:
+    """Expand a generator's range, caching the values on the node."""
+    values = gen.values
+    if values is None:
+        values = gen.values = tuple(expand_range(gen.range_spec))
+    return values
+
+
 # =============================================================================
 # Name Substitution
 # =============================================================================
@@ -135,13 +160,13 @@ def substitute_signal(signal: Signal, variables: dict[str, int]) -> Signal:
             if isinstance(signal.index.start, NumberLiteral):
                 new_start = signal.index.start
             else:
-                new_start = NumberLiteral(value=evaluate_expr(signal.index.start, variables))
+                new_start = number_literal(evaluate_expr(signal.index.start, variables))
         
         if signal.index.end is not None:
             if isinstance(signal.index.end, NumberLiteral):
                 new_end = signal.index.end
             else:
-                new_end = NumberLiteral(value=evaluate_expr(signal.index.end, variables))
+                new_end = number_literal(evaluate_expr(signal.index.end, variables))
         
         new_index = IndexExpr(start=new_start, end=new_end, is_slice=signal.index.is_slice)
     
@@ -154,58 +179,52 @@ def substitute_signal(signal: Signal, variables: dict[str, int]) -> Signal:
 
 def expand_generators_in_list(nodes: list[Node], variables: dict[str, int] = None) -> list[Node]:
     """Expand all generators in a list of nodes."""
-    if variables is None:
-        variables = {}
-    
-    result: list[Node] = []
-    
+    return list(iter_expanded_nodes(nodes, variables if variables is not None else {}))
+
+
+def expand_generator(gen: Generator, outer_variables: dict[str, int]) -> list[Node]:
+    """Expand a single generator into its constituent nodes."""
+    return list(iter_generator_nodes(gen, outer_variables))
+
+
+def iter_expanded_nodes(nodes: list[Node], variables: dict[str, int]) -> Iterator[Node]:
+    """Lazily yield the nodes of a list with all generators expanded."""
     for node in nodes:
         if isinstance(node, Generator):
-            expanded = expand_generator(node, variables)
-            result.extend(expanded)
+            yield from iter_generator_nodes(node, variables)
         elif isinstance(node, Instance):
             # Substitute variables in instance name
-            new_name = substitute_name(node.name, variables)
-            result.append(Instance(
-                name=new_name,
+            yield Instance(
+                name=substitute_name(node.name, variables),
                 component_type=node.component_type,
                 line=node.line,
                 column=node.column
-            ))
+            )
         elif isinstance(node, Constant):
-            new_name = substitute_name(node.name, variables)
-            result.append(Constant(
-                name=new_name,
+            yield Constant(
+                name=substitute_name(node.name, variables),
                 value=node.value,
                 width=node.width,
                 line=node.line,
                 column=node.column
-            ))
+            )
         elif isinstance(node, Connection):
             new_source = substitute_signal(node.source, variables)
             new_dest = substitute_signal(node.destination, variables)
-            result.append(Connection(source=new_source, destination=new_dest))
+            yield Connection(source=new_source, destination=new_dest)
         else:
-            result.append(node)
-    
-    return result
+            yield node
 
 
-def expand_generator(gen: Generator, outer_variables: dict[str, int]) -> list[Node]:
-    """Expand a single generator into its constituent nodes."""
-    values = expand_range(gen.range_spec)
-    result: list[Node] = []
-    
-    for value in values:
+def iter_generator_nodes(gen: Generator, outer_variables: dict[str, int]) -> Iterator[Node]:
+    """Lazily yield the expanded body of a generator for every value in its range."""
+    for value in expand_range(gen.range_spec):
         # Create new variable scope
         variables = dict(outer_variables)
         variables[gen.variable] = value
         
         # Recursively expand the body
-        expanded = expand_generators_in_list(gen.body, variables)
-        result.extend(expanded)
-    
-    return result
+        yield from iter_expanded_nodes(gen.body, variables)
 
 
 # =============================================================================
@@ -214,16 +233,10 @@ def expand_generator(gen: Generator, outer_variables: dict[str, int]) -> list[No
 
 def expand_expanders_in_connections(connections: list[Node]) -> list[Node]:
     """Expand all slice notation in connections to individual bit connections."""
-    result: list[Node] = []
-    
-    for node in connections:
-        if isinstance(node, Connection):
-            expanded = expand_connection_slices(node)
-            result.extend(expanded)
-        else:
-            result.append(node)
-    
-    return result
+    return list(chain.from_iterable(
+        expand_connection_slices(node) if isinstance(node, Connection) else (node,)
+        for node in connections
+    ))
 
 
 def expand_connection_slices(conn: Connection) -> list[Connection]:
@@ -231,98 +244,84 @@ def expand_connection_slices(conn: Connection) -> list[Connection]:
     src = conn.source
     dst = conn.destination
     
-    # Check if either side has a slice
-    src_is_slice = src.index and src.index.is_slice
-    dst_is_slice = dst.index and dst.index.is_slice
+    # The slice on each side, or None if that side isn't sliced
+    src_slice = src.index if src.index is not None and src.index.is_slice else None
+    dst_slice = dst.index if dst.index is not None and dst.index.is_slice else None
     
-    if not src_is_slice and not dst_is_slice:
+    if src_slice is None and dst_slice is None:
         return [conn]
     
-    # Determine the range
-    if src_is_slice and src.index:
-        start = evaluate_expr(src.index.start, {}) if src.index.start else 1
-        end = evaluate_expr(src.index.end, {}) if src.index.end else None
-        if end is None:
-            raise FlattenerError("Cannot expand open-ended slice without context")
-    elif dst_is_slice and dst.index:
-        start = evaluate_expr(dst.index.start, {}) if dst.index.start else 1
-        end = evaluate_expr(dst.index.end, {}) if dst.index.end else None
-        if end is None:
-            raise FlattenerError("Cannot expand open-ended slice without context")
-    else:
-        return [conn]
-    
-    # Generate individual connections
-    result: list[Connection] = []
-    
-    src_start = start
-    dst_start = start
-    
-    if src_is_slice and src.index:
-        src_start = evaluate_expr(src.index.start, {}) if src.index.start else 1
-    if dst_is_slice and dst.index:
-        dst_start = evaluate_expr(dst.index.start, {}) if dst.index.start else 1
-    
+    # The range comes from the source slice if there is one, else the destination
+    index = src_slice if src_slice is not None else dst_slice
+    assert index is not None
+    start, end = _slice_bounds(index)
     width = end - start + 1
     
-    for i in range(width):
-        new_src = Signal(
-            name=src.name,
-            instance=src.instance,
-            index=IndexExpr(start=NumberLiteral(value=src_start + i), is_slice=False) if src_is_slice else src.index
-        )
-        new_dst = Signal(
-            name=dst.name,
-            instance=dst.instance,
-            index=IndexExpr(start=NumberLiteral(value=dst_start + i), is_slice=False) if dst_is_slice else dst.index
-        )
-        result.append(Connection(source=new_src, destination=new_dst))
+    # Generate individual connections
+    return _emit_slice_bits(
+        src, dst, width,
+        _slice_start(src_slice) if src_slice is not None else None,
+        _slice_start(dst_slice) if dst_slice is not None else None
+    )
+
+
+def _slice_start(index: IndexExpr) -> int:
+    """Evaluate the start of a slice, defaulting to 1."""
+    return evaluate_expr(index.start, {}) if index.start else 1
+
+
+def _slice_bounds(index: IndexExpr) -> tuple[int, int]:
+    """Evaluate the (start, end) bounds of a slice; the end is required."""
+    start = _slice_start(index)
+    if not index.end:
+        raise FlattenerError("Cannot expand open-ended slice without context")
+    return start, evaluate_expr(index.end, {})
+
+
+def _emit_slice_bits(src: Signal, dst: Signal, width: int,
+                     src_start: Optional[int], dst_start: Optional[int]) -> list[Connection]:
+    """
+    Emit one bit-level connection per bit of an expanded slice.
     
-    return result
+    A side whose start is None is not sliced and keeps its original index.
+    """
+    sources = _slice_bit_signals(src, src_start, width)
+    destinations = _slice_bit_signals(dst, dst_start, width)
+    return [Connection(source=s, destination=d) for s, d in zip(sources, destinations)]
+
+
+def _slice_bit_signals(signal: Signal, start: Optional[int], width: int) -> list[Signal]:
+    """Build the per-bit signals for one side of an expanded slice."""
+    name = signal.name
+    instance = signal.instance
+    if start is None:
+        index = signal.index
+        return [Signal(name=name, instance=instance, index=index) for _ in range(width)]
+    return [
+        Signal(name=name, instance=instance, index=IndexExpr(start=number_literal(bit), is_slice=False))
+        for bit in range(start, start + width)
+    ]
 
 
 # =============================================================================
 # Phase 4: Constant Materialization
 # =============================================================================
 
+# Power pin primitive for each bit value
+POWER_PINS = ("__GND__", "__VCC__")
+
+
 def materialize_constants(component: Component) -> Component:
     """Convert named constants to __VCC__ and __GND__ instances."""
-    new_instances: list[Node] = []
-    constants: dict[str, int] = {}
-    
-    # First pass: collect constants and create power pin instances
-    for node in component.instances:
-        if isinstance(node, Constant):
-            constants[node.name] = node.value
-            # Determine bit width: use explicit width if provided, otherwise infer from value
-            value = node.value
-            if node.width is not None:
-                bit_width = node.width
-            elif value == 0:
-                bit_width = 1
-            else:
-                bit_width = value.bit_length()
-            
-            # Create __VCC__ or __GND__ instances for each bit
-            for bit in range(1, bit_width + 1):
-                bit_value = (value >> (bit - 1)) & 1
-                pin_type = "__VCC__" if bit_value else "__GND__"
-                new_instances.append(Instance(
-                    name=f"{node.name}_bit{bit}",
-                    component_type=pin_type,
-                    line=node.line,
-                    column=node.column
-                ))
-        else:
-            new_instances.append(node)
+    new_instances, constants, bit_instances = materialize_constant_instances(component.instances)
     
-    # Second pass: update connections to use the materialized constants
+    # Update connections to use the materialized constants
     new_connections: list[Node] = []
     
     if component.connect_block:
         for node in component.connect_block.statements:
             if isinstance(node, Connection):
-                new_conn = rewrite_constant_refs(node, constants)
+                new_conn = rewrite_constant_refs(node, constants, bit_instances)
                 new_connections.append(new_conn)
             else:
                 new_connections.append(node)
@@ -338,15 +337,72 @@ def materialize_constants(component: Component) -> Component:
     )
 
 
-def rewrite_constant_refs(conn: Connection, constants: dict[str, int]) -> Connection:
+def materialize_constant_instances(
+    nodes: list[Node]
+) -> tuple[list[Node], dict[str, int], dict[tuple[str, int], str]]:
+    """
+    Replace constants in an instance list with __VCC__/__GND__ instances.
+    
+    Returns the new instance list, a mapping of constant name to value, and a
+    mapping of (constant name, bit) to the name of the materialized pin instance.
+    """
+    new_instances: list[Node] = []
+    constants: dict[str, int] = {}
+    bit_instances: dict[tuple[str, int], str] = {}
+    
+    for node in nodes:
+        if isinstance(node, Constant):
+            constants[node.name] = node.value
+            # Determine bit width: use explicit width if provided, otherwise infer from value
+            value = node.value
+            if node.width is not None:
+                bit_width = node.width
+            elif value == 0:
+                bit_width = 1
+            else:
+                bit_width = value.bit_length()
+            
+            # Create __VCC__ or __GND__ instances for each bit
+            name, line, column = node.name, node.line, node.column
+            pins = [(bit, f"{name}_bit{bit}") for bit in range(1, bit_width + 1)]
+            bit_instances.update(((name, bit), pin_name) for bit, pin_name in pins)
+            new_instances += [
+                Instance(
+                    name=pin_name,
+                    component_type=POWER_PINS[(value >> (bit - 1)) & 1],
+                    line=line,
+                    column=column
+                )
+                for bit, pin_name in pins
+            ]
+        else:
+            new_instances.append(node)
+    
+    return new_instances, constants, bit_instances
+
+
+def rewrite_constant_refs(
+    conn: Connection,
+    constants: dict[str, int],
+    bit_instances: Optional[dict[tuple[str, int], str]] = None
+) -> Connection:
     """Rewrite constant references in a connection to use power pin instances."""
-    new_source = rewrite_signal_constant(conn.source, constants)
-    new_dest = rewrite_signal_constant(conn.destination, constants)
+    new_source = rewrite_signal_constant(conn.source, constants, bit_instances)
+    new_dest = rewrite_signal_constant(conn.destination, constants, bit_instances)
     return Connection(source=new_source, destination=new_dest)
 
 
-def rewrite_signal_constant(signal: Signal, constants: dict[str, int]) -> Signal:
-    """Rewrite a signal if it references a constant."""
+def rewrite_signal_constant(
+    signal: Signal,
+    constants: dict[str, int],
+    bit_instances: Optional[dict[tuple[str, int], str]] = None
+) -> Signal:
+    """
+    Rewrite a signal if it references a constant.
+    
+    bit_instances, as returned by materialize_constant_instances, supplies the
+    prebuilt pin instance names so they need not be formatted per reference.
+    """
     if signal.instance is None and signal.name in constants:
         # This is a constant reference
         if signal.index and signal.index.start:
@@ -356,18 +412,54 @@ def rewrite_signal_constant(signal: Signal, constants: dict[str, int]) -> Signal
             bit = 1
         # The constant bit is materialized as an instance (e.g., Hundred_bit1: __VCC__)
         # So we need to access its output port: Hundred_bit1.O
+        pin_name = bit_instances.get((signal.name, bit)) if bit_instances else None
         return Signal(
             name="O",  # Output port of __VCC__/__GND__
-            instance=f"{signal.name}_bit{bit}",
+            instance=pin_name or f"{signal.name}_bit{bit}",
             index=None
         )
     return signal
 
 
+def lower_connections(
+    statements: list[Node],
+    constants: dict[str, int],
+    bit_instances: Optional[dict[tuple[str, int], str]] = None,
+    has_slices: bool = True
+) -> list[Node]:
+    """
+    Lower connect block statements to bit-level connections in a single pass.
+    
+    Fuses generator expansion, slice expansion and constant rewriting so each
+    statement is visited once instead of once per phase. Slice expansion is
+    skipped when has_slices is False, and constant rewriting when there are
+    no constants.
+    """
+    nodes = iter_expanded_nodes(statements, {})
+    
+    if has_slices:
+        nodes = chain.from_iterable(
+            expand_connection_slices(node) if isinstance(node, Connection) else (node,)
+            for node in nodes
+        )
+    
+    if constants:
+        nodes = (
+            rewrite_constant_refs(node, constants, bit_instances) if isinstance(node, Connection) else node
+            for node in nodes
+        )
+    
+    return list(nodes)
+
+
 # =============================================================================
 # Phase 5: Hierarchy Flattening
 # =============================================================================
 
+# Bump whenever the AST classes change shape, so stale pickles are never loaded
+MODULE_CACHE_VERSION = b"3"
+
+
 @dataclass
 class ComponentLibrary:
     """A collection of component definitions for resolving references."""
@@ -375,6 +467,9 @@ class ComponentLibrary:
     components: dict[str, Component] = field(default_factory=dict)
     search_paths: list[Path] = field(default_factory=list)
     _loaded_modules: set[str] = field(default_factory=set)  # Track loaded module files
+    cache_dir: Optional[Path] = None  # On-disk cache of parsed modules (disabled if None)
+    # Parsed modules by resolved path, with the (mtime, size) they were parsed at
+    _parsed_files: dict[str, tuple[tuple[int, int], Module]] = field(default_factory=dict)
     
     def add(self, component: Component) -> None:
         """Add a component to the library."""
@@ -396,7 +491,7 @@ class ComponentLibrary:
             # Module name maps directly to filename: use foo::{Bar} -> foo.shdl
             file_path = path / f"{module_name}.shdl"
             if file_path.exists():
-                module = parse_file(str(file_path))
+                module = self.parse_module_file(str(file_path))
                 for comp in module.components:
                     self.add(comp)
                 # Process imports in the loaded module
@@ -407,6 +502,62 @@ class ComponentLibrary:
         
         return False
     
+    def parse_module_file(self, path: str) -> Module:
+        """
+        Parse a module file, reusing an earlier parse when possible.
+        
+        A file already parsed by this library is reused while its mtime and
+        size are unchanged. Otherwise, if cache_dir is enabled, entries there
+        are keyed by a hash of the path and source text, so an edited file is
+        always reparsed.
+        """
+        resolved = Path(path).resolve()
+        stat = resolved.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = self._parsed_files.get(str(resolved))
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        
+        module = self._parse_module_source(path)
+        self._parsed_files[str(resolved)] = (stamp, module)
+        return module
+    
+    def _parse_module_source(self, path: str) -> Module:
+        """Parse a module file, going through the on-disk cache if enabled."""
+        if self.cache_dir is None:
+            return parse_file(path)
+        
+        source = Path(path).read_text()
+        digest = hashlib.sha256(
+            MODULE_CACHE_VERSION + b"\0" + path.encode() + b"\0" + source.encode()
+        ).hexdigest()
+        cache_path = self.cache_dir / f"{digest}.pkl"
+        
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+        except Exception:
+            # Missing, unreadable or stale entry - reparse and (re)write it below
+            cached = None
+        if isinstance(cached, Module):
+            # Register the source so diagnostics can still show snippets
+            SourceFile.register(path, source)
+            return cached
+        
+        module = parse(source, file_path=path)
+        
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(module, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # Caching is best-effort
+            pass
+        
+        return module
+    
     def resolve(self, name: str) -> Component:
         """Resolve a component by name. It must already be loaded via imports."""
         if name in self.components:
@@ -415,22 +566,77 @@ class ComponentLibrary:
         raise FlattenerError(f"Cannot resolve component: {name}. Make sure it is imported via 'use' statement.")
 
 
+# A port bit reference: (port name, bit index), with None for an unindexed port
+PortKey = tuple[str, Optional[int]]
+
+# An internal endpoint of a port mapping: (instance, name, bit index).
+# The instance is None for a bare signal, or WIRE_THROUGH for an output port
+# of the flattened component that is driven directly by one of its inputs.
+PortTarget = tuple[Optional[str], str, Optional[int]]
+
+WIRE_THROUGH = "@OUTPUT"
+
+
 @dataclass
 class PortMapping:
     """
     Port mapping information for a flattened instance.
     
-    For input ports: maps port name to list of internal destinations (fan-out)
-    For output ports: maps port name to the single internal source
+    For input ports: maps port key to list of internal destinations (fan-out)
+    For output ports: maps port key to the single internal source
+    For wire-through outputs: maps output port name to whether any of its
+    wire-through entries is bit-indexed
     """
-    input_mappings: dict[str, list[str]] = field(default_factory=dict)  # port -> [internal destinations]
-    output_mappings: dict[str, str] = field(default_factory=dict)  # port -> internal source
+    input_mappings: dict[PortKey, list[PortTarget]] = field(default_factory=dict)  # port -> [internal destinations]
+    output_mappings: dict[PortKey, PortTarget] = field(default_factory=dict)  # port -> internal source
+    wire_through_outputs: dict[str, bool] = field(default_factory=dict)  # output name -> has indexed entry
+    
+    def add_input(self, key: PortKey, target: PortTarget) -> None:
+        """Add an internal destination to an input port's fan-out."""
+        if key not in self.input_mappings:
+            self.input_mappings[key] = []
+        self.input_mappings[key].append(target)
+        
+        instance, name, bit = target
+        if instance == WIRE_THROUGH:
+            self.wire_through_outputs[name] = self.wire_through_outputs.get(name, False) or bit is not None
+    
+    def is_wire_through_output(self, key: PortKey) -> bool:
+        """Check if an output port reference is driven directly by an input port."""
+        name, bit = key
+        has_indexed = self.wire_through_outputs.get(name)
+        if has_indexed is None:
+            return False
+        return has_indexed or bit is None
 
 
-def flatten_hierarchy(component: Component, library: ComponentLibrary, prefix: str = "") -> Component:
-    """Flatten a component by inlining all subcomponent instances."""
-    new_instances: list[Instance] = []
-    new_connections: list[Connection] = []
+def port_key(signal: Signal) -> PortKey:
+    """Build the port mapping key for a signal (name plus bit index, if any)."""
+    if signal.index and signal.index.start:
+        return (signal.name, evaluate_expr(signal.index.start, {}))
+    return (signal.name, None)
+
+
+def target_signal(target: PortTarget) -> Signal:
+    """Build the signal for an internal port mapping endpoint."""
+    instance, name, bit = target
+    if instance == WIRE_THROUGH:
+        instance = None
+    index = IndexExpr(start=number_literal(bit), is_slice=False) if bit is not None else None
+    return Signal(name=name, instance=instance, index=index)
+
+
+def flatten_hierarchy(component: Component, library: ComponentLibrary,
+                      flattened: dict[str, Component]) -> Component:
+    """
+    Flatten one level of a lowered component by inlining its subcomponent instances.
+    
+    Subcomponents are not flattened here: their unprefixed flattened bodies must
+    already be present in `flattened`, keyed by component name. The result's
+    instances are all primitive Instance nodes.
+    """
+    new_instances: list[Node] = []
+    new_connections: list[Node] = []
     
     # Collect port mappings for each instance
     # Maps: instance_name -> PortMapping
@@ -439,53 +645,42 @@ def flatten_hierarchy(component: Component, library: ComponentLibrary, prefix: s
     for node in component.instances:
         if isinstance(node, Instance):
             if is_primitive(node.component_type):
-                # Keep primitive instances, but apply prefix
-                new_name = f"{prefix}{node.name}" if prefix else node.name
+                # Keep primitive instances
                 new_instances.append(Instance(
-                    name=new_name,
+                    name=node.name,
                     component_type=node.component_type,
                     line=node.line,
                     column=node.column
                 ))
             else:
-                # Resolve and flatten the subcomponent
                 sub_component = library.resolve(node.component_type)
                 
-                # First, flatten the subcomponent itself (recursively)
-                sub_prefix = f"{prefix}{node.name}_"
-                flattened_sub = flatten_component_full(sub_component, library, sub_prefix)
+                # Inline the already-flattened subcomponent under this instance's prefix
+                sub_prefix = f"{node.name}_"
+                flattened_sub = prefix_component(flattened[node.component_type], sub_prefix)
                 
                 # Add all instances from the flattened subcomponent
-                for sub_inst in flattened_sub.instances:
-                    if isinstance(sub_inst, Instance):
-                        new_instances.append(sub_inst)
+                # (flattened instance lists only ever hold primitive Instances)
+                new_instances += flattened_sub.instances
+                
+                # Split the flattened connections: internal ones are kept as-is,
+                # port-touching ones are handled by parent rewiring
+                internal, port_connections = partition_port_connections(flattened_sub, sub_component)
                 
                 # Build port mapping for this instance
-                port_mappings[node.name] = build_port_mapping(sub_component, flattened_sub, sub_prefix)
+                port_mappings[node.name] = build_port_mapping(sub_component, port_connections, sub_prefix)
                 
                 # Add internal connections from the flattened subcomponent
-                # But SKIP connections that involve ports (those are handled by parent rewiring)
-                if flattened_sub.connect_block:
-                    for conn in flattened_sub.connect_block.statements:
-                        if isinstance(conn, Connection):
-                            src_is_in, src_is_out = is_port_signal(conn.source, sub_component)
-                            dst_is_in, dst_is_out = is_port_signal(conn.destination, sub_component)
-                            
-                            # Skip connections FROM input ports (handled by parent rewiring)
-                            if src_is_in:
-                                continue
-                            # Skip connections TO output ports (handled by parent rewiring)
-                            if dst_is_out:
-                                continue
-                            # These are internal connections - keep them
-                            new_connections.append(conn)
+                new_connections.extend(internal)
     
     # Process connections from the parent, rewiring through port mappings
     if component.connect_block:
-        for node in component.connect_block.statements:
-            if isinstance(node, Connection):
-                rewired = rewire_connection(node, port_mappings, prefix, component)
-                new_connections.extend(rewired)
+        ports = port_name_sets(component)
+        new_connections += chain.from_iterable(
+            rewire_connection(node, port_mappings, "", component, ports)
+            for node in component.connect_block.statements
+            if isinstance(node, Connection)
+        )
     
     return Component(
         name=component.name,
@@ -498,6 +693,49 @@ def flatten_hierarchy(component: Component, library: ComponentLibrary, prefix: s
     )
 
 
+def prefix_component(component: Component, prefix: str) -> Component:
+    """Return a copy of a flattened component with every instance name prefixed."""
+    instances: list[Node] = [
+        Instance(
+            name=f"{prefix}{inst.name}",
+            component_type=inst.component_type,
+            line=inst.line,
+            column=inst.column
+        )
+        for inst in component.instances
+        if isinstance(inst, Instance)
+    ]
+    
+    connect_block = None
+    if component.connect_block:
+        statements: list[Node] = [
+            Connection(
+                source=prefix_signal(conn.source, prefix),
+                destination=prefix_signal(conn.destination, prefix)
+            )
+            for conn in component.connect_block.statements
+            if isinstance(conn, Connection)
+        ]
+        connect_block = ConnectBlock(statements=statements)
+    
+    return Component(
+        name=component.name,
+        inputs=component.inputs,
+        outputs=component.outputs,
+        instances=instances,
+        connect_block=connect_block,
+        line=component.line,
+        column=component.column
+    )
+
+
+def prefix_signal(signal: Signal, prefix: str) -> Signal:
+    """Prefix the instance of an instance.port reference; port references are unchanged."""
+    if signal.instance is None:
+        return signal
+    return Signal(name=signal.name, instance=f"{prefix}{signal.instance}", index=signal.index)
+
+
 def is_input_port(name: str, component: Component) -> bool:
     """Check if a name matches an input port of the component (ignoring indices)."""
     for port in component.inputs:
@@ -514,21 +752,62 @@ def is_output_port(name: str, component: Component) -> bool:
     return False
 
 
-def is_port_signal(signal: Signal, component: Component) -> tuple[bool, bool]:
+# The (input, output) port name sets of a component
+PortNames = tuple[frozenset[str], frozenset[str]]
+
+
+def port_name_sets(component: Component) -> PortNames:
+    """Build the input and output port name sets of a component for fast membership tests."""
+    return (
+        frozenset(p.name for p in component.inputs),
+        frozenset(p.name for p in component.outputs)
+    )
+
+
+def is_port_signal(signal: Signal, component: Component,
+                   ports: Optional[PortNames] = None) -> tuple[bool, bool]:
     """
     Check if a signal references a port (input or output) of the component.
     Returns (is_input, is_output).
     A signal references a port if it has no instance and its name matches a port name.
+    Pass `ports` (from port_name_sets) when checking many signals of one component.
     """
     if signal.instance is not None:
         return (False, False)
     
-    is_in = any(p.name == signal.name for p in component.inputs)
-    is_out = any(p.name == signal.name for p in component.outputs)
-    return (is_in, is_out)
+    inputs, outputs = ports if ports is not None else port_name_sets(component)
+    return (signal.name in inputs, signal.name in outputs)
+
+
+def partition_port_connections(
+    flattened: Component, original: Component
+) -> tuple[list[Connection], list[Connection]]:
+    """
+    Partition the connections of a flattened component by whether they touch its ports.
+    
+    Returns (internal, port_connections). Port connections are those FROM an
+    input port or TO an output port of the original component; they are the
+    only ones build_port_mapping needs to see.
+    """
+    internal: list[Connection] = []
+    port_connections: list[Connection] = []
+    ports = port_name_sets(original)
+    
+    if flattened.connect_block:
+        for conn in flattened.connect_block.statements:
+            if isinstance(conn, Connection):
+                src_is_in, _ = is_port_signal(conn.source, original, ports)
+                _, dst_is_out = is_port_signal(conn.destination, original, ports)
+                
+                if src_is_in or dst_is_out:
+                    port_connections.append(conn)
+                else:
+                    internal.append(conn)
+    
+    return internal, port_connections
 
 
-def build_port_mapping(original: Component, flattened: Component, prefix: str) -> PortMapping:
+def build_port_mapping(original: Component, port_connections: list[Connection], prefix: str) -> PortMapping:
     """
     Build a mapping from port names to the internal signals that drive/receive them.
     
@@ -540,14 +819,15 @@ def build_port_mapping(original: Component, flattened: Component, prefix: str) -
     writes to the input, it also writes to the output.
     """
     mapping = PortMapping()
+    ports = port_name_sets(original)
     
     # First, scan the ORIGINAL component for wire-through connections
     # These are filtered out during flattening, so we need to capture them here
     if original.connect_block:
         for conn in original.connect_block.statements:
             if isinstance(conn, Connection):
-                src_is_in, _ = is_port_signal(conn.source, original)
-                _, dst_is_out = is_port_signal(conn.destination, original)
+                src_is_in, _ = is_port_signal(conn.source, original, ports)
+                _, dst_is_out = is_port_signal(conn.destination, original, ports)
                 
                 # Wire-through: input -> output
                 if src_is_in and dst_is_out:
@@ -555,84 +835,54 @@ def build_port_mapping(original: Component, flattened: Component, prefix: str) -
                     dst = conn.destination
                     
                     # Build input port key
-                    if src.index and src.index.start:
-                        idx = evaluate_expr(src.index.start, {})
-                        input_key = f"{src.name}[{idx}]"
-                    else:
-                        input_key = src.name
+                    input_key = port_key(src)
                     
                     # Build output marker
-                    if dst.index and dst.index.start:
-                        dst_idx = evaluate_expr(dst.index.start, {})
-                        output_marker = f"@OUTPUT:{dst.name}[{dst_idx}]"
-                    else:
-                        output_marker = f"@OUTPUT:{dst.name}"
+                    output_marker = (WIRE_THROUGH, *port_key(dst))
                     
-                    if input_key not in mapping.input_mappings:
-                        mapping.input_mappings[input_key] = []
-                    mapping.input_mappings[input_key].append(output_marker)
+                    mapping.add_input(input_key, output_marker)
     
-    # Then scan the flattened component for regular port connections
-    if flattened.connect_block:
-        for conn in flattened.connect_block.statements:
-            if isinstance(conn, Connection):
-                src_is_in, _ = is_port_signal(conn.source, original)
-                _, dst_is_out = is_port_signal(conn.destination, original)
-                
-                # Check if source is an input port (input port -> something)
-                if src_is_in:
-                    port_name = conn.source.name
-                    # Build the port key including index if present
-                    if conn.source.index and conn.source.index.start:
-                        idx = evaluate_expr(conn.source.index.start, {})
-                        port_key = f"{port_name}[{idx}]"
-                    else:
-                        port_key = port_name
-                    
-                    # The destination - could be internal gate or output port (wire-through)
-                    dst = conn.destination
-                    if dst.instance:
-                        internal_signal = f"{dst.instance}.{dst.name}"
-                    elif dst_is_out:
-                        # Wire-through: input -> output
-                        # Mark with special prefix so we know it's an output port
-                        if dst.index and dst.index.start:
-                            dst_idx = evaluate_expr(dst.index.start, {})
-                            internal_signal = f"@OUTPUT:{dst.name}[{dst_idx}]"
-                        else:
-                            internal_signal = f"@OUTPUT:{dst.name}"
-                    else:
-                        internal_signal = dst.name
-                    
-                    # Add to the list of destinations for this input port
-                    if port_key not in mapping.input_mappings:
-                        mapping.input_mappings[port_key] = []
-                    mapping.input_mappings[port_key].append(internal_signal)
-                
-                # Check if destination is an output port (internal gate -> output port)
-                # Skip wire-through here since it's handled above
-                if dst_is_out and not src_is_in:
-                    port_name = conn.destination.name
-                    # Build the port key including index if present
-                    if conn.destination.index and conn.destination.index.start:
-                        idx = evaluate_expr(conn.destination.index.start, {})
-                        port_key = f"{port_name}[{idx}]"
-                    else:
-                        port_key = port_name
-                    
-                    # The source is the internal signal
-                    src = conn.source
-                    if src.instance:
-                        internal_signal = f"{src.instance}.{src.name}"
-                    else:
-                        internal_signal = src.name
-                    mapping.output_mappings[port_key] = internal_signal
+    # Then scan the flattened port-touching connections for regular port connections
+    for conn in port_connections:
+        src_is_in, _ = is_port_signal(conn.source, original, ports)
+        _, dst_is_out = is_port_signal(conn.destination, original, ports)
+        
+        # Check if source is an input port (input port -> something)
+        if src_is_in:
+            # Build the port key including index if present
+            in_key = port_key(conn.source)
+            
+            # The destination - could be internal gate or output port (wire-through)
+            dst = conn.destination
+            if dst.instance:
+                internal_signal: PortTarget = (dst.instance, dst.name, None)
+            elif dst_is_out:
+                # Wire-through: input -> output
+                # Mark with special instance so we know it's an output port
+                internal_signal = (WIRE_THROUGH, *port_key(dst))
+            else:
+                internal_signal = (None, dst.name, None)
+            
+            # Add to the list of destinations for this input port
+            mapping.add_input(in_key, internal_signal)
+        
+        # Check if destination is an output port (internal gate -> output port)
+        # Skip wire-through here since it's handled above
+        if dst_is_out and not src_is_in:
+            # Build the port key including index if present
+            out_key = port_key(conn.destination)
+            
+            # The source is the internal signal
+            src = conn.source
+            internal_signal = (src.instance or None, src.name, None)
+            mapping.output_mappings[out_key] = internal_signal
     
     return mapping
 
 
 def rewire_connection(conn: Connection, port_mappings: dict[str, PortMapping], 
-                      prefix: str, component: Component) -> list[Connection]:
+                      prefix: str, component: Component,
+                      ports: Optional[PortNames] = None) -> list[Connection]:
     """Rewire a connection, replacing instance.port references with internal signals.
     
     Returns a list of connections because input port fan-out may require
@@ -643,47 +893,31 @@ def rewire_connection(conn: Connection, port_mappings: dict[str, PortMapping],
     
     # Skip connections from input port to output port (wire-through)
     # These are handled via port mappings, not as actual connections
-    src_is_in, _ = is_port_signal(src, component)
-    _, dst_is_out = is_port_signal(dst, component)
+    src_is_in, _ = is_port_signal(src, component, ports)
+    _, dst_is_out = is_port_signal(dst, component, ports)
     if src_is_in and dst_is_out:
         return []
     
-    # Helper to build port key from signal
-    def get_port_key(signal: Signal) -> str:
-        if signal.index and signal.index.start:
-            idx = evaluate_expr(signal.index.start, {})
-            return f"{signal.name}[{idx}]"
-        return signal.name
+    dst_mapping = port_mappings.get(dst.instance) if dst.instance else None
+    src_mapping = port_mappings.get(src.instance) if src.instance else None
+    
+    # Fast path: neither endpoint is a flattened instance, so only the prefix applies
+    if dst_mapping is None and src_mapping is None:
+        if not prefix:
+            return [conn]
+        return [Connection(source=prefix_signal(src, prefix), destination=prefix_signal(dst, prefix))]
     
     # Check if destination is an instance port that was flattened (instance.port)
-    if dst.instance and dst.instance in port_mappings:
-        mapping = port_mappings[dst.instance]
-        port_key = get_port_key(dst)
+    if dst_mapping is not None:
+        destinations = dst_mapping.input_mappings.get(port_key(dst))
         
         # Check if this is an input port with fan-out
-        if port_key in mapping.input_mappings:
+        if destinations is not None:
             # Create one connection for each internal destination
             result = []
-            for internal_dest in mapping.input_mappings[port_key]:
-                # Check for wire-through marker (@OUTPUT:portname)
-                if internal_dest.startswith("@OUTPUT:"):
-                    # This is a wire-through to an output port
-                    # Connect source directly to the parent's output port
-                    output_ref = internal_dest[8:]  # Remove "@OUTPUT:" prefix
-                    # Parse potential index like "N" or "Y[5]"
-                    if "[" in output_ref:
-                        out_name, idx_part = output_ref.split("[", 1)
-                        out_idx = int(idx_part.rstrip("]"))
-                        new_dst = Signal(name=out_name, instance=None, 
-                                        index=IndexExpr(start=NumberLiteral(value=out_idx), is_slice=False))
-                    else:
-                        new_dst = Signal(name=output_ref, instance=None, index=None)
-                elif "." in internal_dest:
-                    # Parse internal_dest like "fa1_x1.A"
-                    parts = internal_dest.split(".", 1)
-                    new_dst = Signal(name=parts[1], instance=parts[0], index=None)
-                else:
-                    new_dst = Signal(name=internal_dest, instance=None, index=None)
+            for internal_dest in destinations:
+                # Internal gate port, or (for wire-through) the parent's output port
+                new_dst = target_signal(internal_dest)
                 
                 # Preserve the source signal (with its index!)
                 new_src = rewire_signal_for_source(src, port_mappings, prefix, component)
@@ -692,19 +926,13 @@ def rewire_connection(conn: Connection, port_mappings: dict[str, PortMapping],
             return result
     
     # Check if source is an instance port that was flattened (instance.port)
-    if src.instance and src.instance in port_mappings:
-        mapping = port_mappings[src.instance]
-        port_key = get_port_key(src)
+    if src_mapping is not None:
+        src_key = port_key(src)
+        internal_src = src_mapping.output_mappings.get(src_key)
         
         # Check if this is an output port with a known driver
-        if port_key in mapping.output_mappings:
-            internal_src = mapping.output_mappings[port_key]
-            # Parse internal_src like "fa1_x2.O"
-            if "." in internal_src:
-                parts = internal_src.split(".", 1)
-                new_src = Signal(name=parts[1], instance=parts[0], index=None)
-            else:
-                new_src = Signal(name=internal_src, instance=None, index=None)
+        if internal_src is not None:
+            new_src = target_signal(internal_src)
             
             # Preserve the destination signal (with its index!)
             new_dst = rewire_signal_for_dest(dst, port_mappings, prefix, component)
@@ -715,14 +943,9 @@ def rewire_connection(conn: Connection, port_mappings: dict[str, PortMapping],
         # Check if this is a wire-through output (driven by an input port)
         # In this case, the connection is already handled via input_mappings
         # when the parent writes to the corresponding input port
-        for input_key, destinations in mapping.input_mappings.items():
-            for dest in destinations:
-                if dest.startswith("@OUTPUT:"):
-                    output_ref = dest[8:]
-                    # Check if this matches the port we're looking for
-                    if output_ref == port_key or output_ref.startswith(f"{src.name}["):
-                        # This output is a wire-through, skip it
-                        return []
+        if src_mapping.is_wire_through_output(src_key):
+            # This output is a wire-through, skip it
+            return []
     
     # No port mapping needed - just apply prefix to primitive instance references
     new_src = rewire_signal_for_source(src, port_mappings, prefix, component)
@@ -742,25 +965,18 @@ def rewire_signal_for_source(signal: Signal, port_mappings: dict[str, PortMappin
         return Signal(name=signal.name, instance=None, index=signal.index)
     
     # It's an instance.port reference
-    if signal.instance in port_mappings:
+    mapping = port_mappings.get(signal.instance)
+    if mapping is not None:
         # This is a reference to a non-primitive instance that was flattened
-        mapping = port_mappings[signal.instance]
-        
-        # Build the port key including index if present (output mappings use indexed keys)
-        if signal.index and signal.index.start:
-            idx = evaluate_expr(signal.index.start, {})
-            port_key = f"{signal.name}[{idx}]"
-        else:
-            port_key = signal.name
+        # Look up by port key including index if present (output mappings use indexed keys)
+        internal = mapping.output_mappings.get(port_key(signal))
         
         # For source, we need output port mapping
-        if port_key in mapping.output_mappings:
-            internal = mapping.output_mappings[port_key]
-            if "." in internal:
-                parts = internal.split(".", 1)
-                return Signal(name=parts[1], instance=parts[0], index=None)
-            else:
-                return Signal(name=internal, instance=None, index=signal.index)
+        if internal is not None:
+            instance, name, _ = internal
+            if instance is not None:
+                return Signal(name=name, instance=instance, index=None)
+            return Signal(name=name, instance=None, index=signal.index)
 
         # Defensive guard: port not found in mappings for a flattened instance
         raise FlattenerError(
@@ -781,27 +997,20 @@ def rewire_signal_for_dest(signal: Signal, port_mappings: dict[str, PortMapping]
         return Signal(name=signal.name, instance=None, index=signal.index)
     
     # It's an instance.port reference
-    if signal.instance in port_mappings:
+    mapping = port_mappings.get(signal.instance)
+    if mapping is not None:
         # This is a reference to a non-primitive instance that was flattened
-        mapping = port_mappings[signal.instance]
-        
-        # Build the port key including index if present (input mappings use indexed keys)
-        if signal.index and signal.index.start:
-            idx = evaluate_expr(signal.index.start, {})
-            port_key = f"{signal.name}[{idx}]"
-        else:
-            port_key = signal.name
+        # Look up by port key including index if present (input mappings use indexed keys)
+        internal = mapping.input_mappings.get(port_key(signal))
         
         # For destination, we need input port mapping (but this is handled in rewire_connection)
         # If we get here, something is wrong
-        if port_key in mapping.input_mappings:
+        if internal is not None:
             # Take the first one (this shouldn't really happen as fan-out is handled above)
-            internal = mapping.input_mappings[port_key][0]
-            if "." in internal:
-                parts = internal.split(".", 1)
-                return Signal(name=parts[1], instance=parts[0], index=None)
-            else:
-                return Signal(name=internal, instance=None, index=signal.index)
+            instance, name, _ = internal[0]
+            if instance is not None and instance != WIRE_THROUGH:
+                return Signal(name=name, instance=instance, index=None)
+            return Signal(name=name, instance=None, index=signal.index)
 
         # Defensive guard: port not found in mappings for a flattened instance
         raise FlattenerError(
@@ -817,38 +1026,86 @@ def rewire_signal_for_dest(signal: Signal, port_mappings: dict[str, PortMapping]
 # Full Flattening Pipeline
 # =============================================================================
 
-def flatten_component_full(component: Component, library: ComponentLibrary, prefix: str = "") -> Component:
-    """Apply all flattening phases to a component."""
+def lower_component(component: Component) -> Component:
+    """Apply phases 2-4 (generators, slices, constants) to a component."""
     
     # Phase 2: Expand generators in instances
     expanded_instances = expand_generators_in_list(component.instances)
     
-    # Phase 2: Expand generators in connections
-    expanded_connections: list[Node] = []
-    if component.connect_block:
-        expanded_connections = expand_generators_in_list(component.connect_block.statements)
+    # Phase 4: Materialize constants as power pin instances
+    instances, constants, bit_instances = materialize_constant_instances(expanded_instances)
     
-    # Phase 3: Expand expanders (slices) in connections
-    expanded_connections = expand_expanders_in_connections(expanded_connections)
+    # Phases 2-4: Expand generators, slices and constant refs in connections
+    connections: list[Node] = []
+    if component.connect_block:
+        connections = lower_connections(
+            component.connect_block.statements, constants, bit_instances,
+            has_slices=component.connect_block.has_slices is not False
+        )
     
-    # Create intermediate component
-    intermediate = Component(
+    return Component(
         name=component.name,
         inputs=component.inputs,
         outputs=component.outputs,
-        instances=expanded_instances,
-        connect_block=ConnectBlock(statements=expanded_connections) if expanded_connections else None,
+        instances=instances,
+        connect_block=ConnectBlock(statements=connections) if connections else None,
         line=component.line,
         column=component.column
     )
+
+
+def flatten_component_full(
+    component: Component,
+    library: ComponentLibrary,
+    prefix: str = "",
+    flattened: Optional[dict[str, Component]] = None
+) -> Component:
+    """
+    Apply all flattening phases to a component.
     
-    # Phase 4: Materialize constants
-    intermediate = materialize_constants(intermediate)
+    The component and every subcomponent it reaches are lowered and flattened
+    leaves-first with an explicit worklist, so each component type is flattened
+    once and there is no Python recursion per hierarchy level.
     
-    # Phase 5: Flatten hierarchy
-    flattened = flatten_hierarchy(intermediate, library, prefix)
+    ``flattened`` maps component names to their flattened (unprefixed) bodies.
+    Passing the same dict to several calls reuses the work already done for
+    shared subcomponents; it must be discarded whenever the library changes.
+    """
+    if flattened is None:
+        flattened = {}
+    
+    if component.name in flattened:
+        result = flattened[component.name]
+        return prefix_component(result, prefix) if prefix else result
+    
+    # Depth-first worklist of (lowered component, iterator over its remaining instances)
+    root = lower_component(component)
+    stack = [(root, iter(root.instances))]
+    in_progress = {component.name}
+    
+    while stack:
+        lowered, pending = stack[-1]
+        for node in pending:
+            if not isinstance(node, Instance) or is_primitive(node.component_type):
+                continue
+            if node.component_type in flattened:
+                continue
+            if node.component_type in in_progress:
+                raise FlattenerError(f"Recursive instantiation of component: {node.component_type}")
+            
+            # Descend into the subcomponent before finishing this one
+            sub = lower_component(library.resolve(node.component_type))
+            in_progress.add(node.component_type)
+            stack.append((sub, iter(sub.instances)))
+            break
+        else:
+            # All subcomponents are flattened - Phase 5: flatten this level
+            stack.pop()
+            in_progress.discard(lowered.name)
+            flattened[lowered.name] = flatten_hierarchy(lowered, library, flattened)
     
-    return flattened
+    result = flattened[component.name]
+    return prefix_component(result, prefix) if prefix else result
 
 
 # =============================================================================
@@ -861,22 +1118,34 @@ class Flattener:
 
     search_paths: list[str] = field(default_factory=list)
     validate: bool = True
+    cache_dir: Optional[str] = None
 
     def __post_init__(self) -> None:
         self._library = ComponentLibrary(
-            search_paths=[Path(p) for p in self.search_paths]
+            search_paths=[Path(p) for p in self.search_paths],
+            cache_dir=Path(self.cache_dir) if self.cache_dir else None
         )
         self._module: Optional[Module] = None
         self._file_path: Optional[str] = None
+        # Results reused across flatten() calls until the library changes
+        self._flattened: dict[str, Component] = {}
+        self._validated = False
+
+    def _invalidate(self) -> None:
+        """Forget cached flattening and validation results."""
+        self._flattened = {}
+        self._validated = False
 
     def add_component(self, component: Component) -> None:
         """Add a component to the library."""
         self._library.add(component)
+        self._invalidate()
 
     def load_file(self, path: str) -> Module:
         """Load and parse an SHDL file, adding its components to the library."""
-        module = parse_file(path)
+        module = self._library.parse_module_file(path)
         self._file_path = path
+        self._invalidate()
 
         # Process imports first - load all referenced modules
         for imp in module.imports:
@@ -893,6 +1162,7 @@ class Flattener:
     def load_source(self, source: str) -> Module:
         """Load and parse SHDL source code, adding its components to the library."""
         module = parse(source)
+        self._invalidate()
         for comp in module.components:
             self._library.add(comp)
         self._module = module
@@ -914,11 +1184,18 @@ class Flattener:
             result.raise_if_errors()
 
     def flatten(self, component_name: str) -> Component:
-        """Flatten a component by name."""
-        if self.validate:
+        """
+        Flatten a component by name.
+        
+        Results are memoized until the library changes, so repeated calls
+        return the same Component object. It is shared with later callers
+        and must not be mutated; copy it first if it needs changing.
+        """
+        if self.validate and not self._validated:
             self._run_semantic_analysis()
+            self._validated = True
         component = self._library.resolve(component_name)
-        return flatten_component_full(component, self._library)
+        return flatten_component_full(component, self._library, flattened=self._flattened)
 
     def flatten_to_base_shdl(self, component_name: str) -> str:
         """Flatten a component and return Base SHDL source code."""
@@ -928,27 +1205,26 @@ class Flattener:
 
 def format_base_shdl(component: Component) -> str:
     """Format a flattened component as Base SHDL source code."""
-    lines: list[str] = []
-    
     # Component header
-    inputs = ", ".join(format_port(p) for p in component.inputs)
-    outputs = ", ".join(format_port(p) for p in component.outputs)
-    lines.append(f"component {component.name}({inputs}) -> ({outputs}) {{")
+    inputs = ", ".join(map(format_port, component.inputs))
+    outputs = ", ".join(map(format_port, component.outputs))
+    lines = [f"component {component.name}({inputs}) -> ({outputs}) {{"]
     
     # Instances
-    for node in component.instances:
-        if isinstance(node, Instance):
-            lines.append(f"    {node.name}: {node.component_type};")
+    lines.extend(
+        f"    {node.name}: {node.component_type};"
+        for node in component.instances
+        if isinstance(node, Instance)
+    )
     
     # Connect block
     if component.connect_block and component.connect_block.statements:
-        lines.append("")
-        lines.append("    connect {")
-        for node in component.connect_block.statements:
-            if isinstance(node, Connection):
-                src = format_signal(node.source)
-                dst = format_signal(node.destination)
-                lines.append(f"        {src} -> {dst};")
+        lines += ("", "    connect {")
+        lines.extend(
+            f"        {format_signal(node.source)} -> {format_signal(node.destination)};"
+            for node in component.connect_block.statements
+            if isinstance(node, Connection)
+        )
         lines.append("    }")
     
     lines.append("}")
@@ -965,16 +1241,13 @@ def format_port(port: Port) -> str:
 
 def format_signal(signal: Signal) -> str:
     """Format a signal reference."""
-    result = ""
-    if signal.instance:
-        result = f"{signal.instance}."
-    result += signal.name
+    name = f"{signal.instance}.{signal.name}" if signal.instance else signal.name
     
-    if signal.index and signal.index.start:
-        if isinstance(signal.index.start, NumberLiteral):
-            result += f"[{signal.index.start.value}]"
+    index = signal.index
+    if index and isinstance(index.start, NumberLiteral):
+        return f"{name}[{index.start.value}]"
     
-    return result
+    return name
 
 
 def flatten_file(path: str, search_paths: list[str] = None) -> str:
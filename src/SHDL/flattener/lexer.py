@@ -5,10 +5,57 @@ Tokenizes SHDL source code into a stream of tokens.
 """
 
 from dataclasses import dataclass, field
-from typing import Iterator, Optional
+from bisect import bisect_right
+from typing import Callable, Iterator, Optional, Sequence
+import re
+import sys
 
 from .tokens import Token, TokenType, KEYWORDS
-from ..errors import LexerError, ErrorCode, ErrorCode
+from ..errors import LexerError, ErrorCode
+
+
+# Matchers for the tokens whose extent isn't known from their first character.
+# Patterns are compiled once at import and kept as bound match methods.
+
+# Runs of whitespace and line comments are skipped together in one match
+_match_trivia = re.compile(r"(?:[ \t\r\n]+|#[^\n]*)+").match
+# Digits after a 0x/0b prefix are optional so a bare prefix can be reported
+_match_number = re.compile(r"0[xX][0-9a-fA-F]*|0[bB][01]*|\d+").match
+_match_identifier = re.compile(r"[^\W\d]\w*").match
+
+
+def _end(match: Optional[re.Match[str]]) -> int:
+    """End offset of a match the dispatch table guarantees will succeed."""
+    assert match is not None
+    return match.end()
+
+
+_OPERATORS = {
+    "->": TokenType.ARROW,
+    "::": TokenType.DOUBLE_COLON,
+    ":": TokenType.COLON,
+    ";": TokenType.SEMICOLON,
+    ",": TokenType.COMMA,
+    ".": TokenType.DOT,
+    "=": TokenType.EQUALS,
+    "{": TokenType.LBRACE,
+    "}": TokenType.RBRACE,
+    "[": TokenType.LBRACKET,
+    "]": TokenType.RBRACKET,
+    "(": TokenType.LPAREN,
+    ")": TokenType.RPAREN,
+    ">": TokenType.GREATER,
+    "+": TokenType.PLUS,
+    "-": TokenType.MINUS,
+    "*": TokenType.STAR,
+    "/": TokenType.SLASH,
+}
+
+# Token type and shared text for each operator, so every operator token
+# carries the same interned string instead of a fresh slice of the source
+_OPERATOR_ENTRIES: dict[str, tuple[TokenType, str]] = {
+    text: (token_type, sys.intern(text)) for text, token_type in _OPERATORS.items()
+}
 
 
 @dataclass
@@ -25,276 +72,205 @@ class Lexer:
     def __post_init__(self) -> None:
         self._pos: int = 0
         self._line: int = 1
-        self._column: int = 1
+        self._line_start: int = 0
         self._tokens: list[Token] = []
+        self._append = self._tokens.append
+        self._line_starts: Optional[list[int]] = None
+        # Token type and interned text for each identifier lexeme seen so far
+        self._identifiers: dict[str, tuple[TokenType, str]] = {}
     
     @property
-    def _current(self) -> str:
-        """Get the current character, or empty string if at end."""
-        if self._pos >= len(self.source):
-            return ""
-        return self.source[self._pos]
-    
-    @property
-    def _peek(self) -> str:
-        """Peek at the next character."""
-        if self._pos + 1 >= len(self.source):
-            return ""
-        return self.source[self._pos + 1]
+    def line_starts(self) -> list[int]:
+        """Offsets at which each line of the source begins (computed once)."""
+        if self._line_starts is None:
+            self._line_starts = [0]
+            self._line_starts.extend(m.end() for m in re.finditer("\n", self.source))
+        return self._line_starts
     
-    def _advance(self) -> str:
-        """Advance to the next character and return the current one."""
-        char = self._current
-        self._pos += 1
-        if char == "\n":
-            self._line += 1
-            self._column = 1
-        else:
-            self._column += 1
-        return char
+    def _emit(self, token_type: TokenType, value: object, start: int, end: int) -> None:
+        """
+        Append a single-line token spanning source[start:end].
+        
+        Every token except EOF is created here; no token spans lines, so
+        the end column follows from the start and the length, and the end
+        line is left for Token to default to the start line.
+        """
+        column = start - self._line_start + 1
+        self._append(Token(
+            token_type, value, self._line, column, None, column + end - start - 1, self.file_path
+        ))
     
-    def _make_token(
-        self,
-        token_type: TokenType,
-        value: any,
-        start_line: int,
-        start_col: int,
-        end_line: int = None,
-        end_col: int = None
-    ) -> Token:
-        """Create a token with full position information."""
-        return Token(
-            type=token_type,
-            value=value,
-            line=start_line,
-            column=start_col,
-            end_line=end_line if end_line is not None else self._line,
-            end_column=end_col if end_col is not None else self._column - 1,
-            file_path=self.file_path
+    def _error(self, message: str, pos: int, code: ErrorCode) -> LexerError:
+        """Build a LexerError located at a source offset on the current line."""
+        return LexerError(
+            message,
+            line=self._line,
+            column=pos - self._line_start + 1,
+            file_path=self.file_path,
+            code=code
         )
     
-    def _add_token(self, token_type: TokenType, value: any = None) -> None:
-        """Add a token to the list (for backward compatibility)."""
-        self._tokens.append(Token(
-            type=token_type,
-            value=value,
-            line=self._line,
-            column=self._column,
-            file_path=self.file_path
-        ))
+    def _advance_lines(self, start: int, end: int) -> None:
+        """Move the line tracking past any newlines in source[start:end]."""
+        if self.source.find("\n", start, end) != -1:
+            line_starts = self.line_starts
+            # Lines only move forward, so search from the current one
+            self._line = bisect_right(line_starts, end, self._line)
+            self._line_start = line_starts[self._line - 1]
     
-    def _skip_whitespace(self) -> None:
-        """Skip whitespace characters (except newlines which may be significant)."""
-        while self._current and self._current in " \t\r\n":
-            self._advance()
+    # Scanners. Each one is entered with the first character of its token at
+    # ``pos`` and returns the offset just past what it consumed.
     
-    def _skip_line_comment(self) -> None:
-        """Skip a # comment to end of line."""
-        self._advance()  # Skip the #
-        while self._current and self._current != "\n":
-            self._advance()
+    def _scan_trivia(self, pos: int) -> int:
+        end = _end(_match_trivia(self.source, pos))
+        self._advance_lines(pos, end)
+        return end
     
-    def _skip_string_comment(self) -> None:
-        """Skip a string comment (single or triple quoted)."""
-        start_line, start_col = self._line, self._column
-        
-        # Check for triple quotes
-        if self._peek == '"':
-            self._advance()  # first "
-            if self._peek == '"':
-                self._advance()  # second "
-                self._advance()  # third "
-                # Triple quoted - find closing """
-                while self._current:
-                    if self._current == '"' and self._peek == '"':
-                        self._advance()  # first closing "
-                        if self._peek == '"':
-                            self._advance()  # second closing "
-                            self._advance()  # third closing "
-                            return
-                    else:
-                        self._advance()
-                raise LexerError(
-                    "Unterminated triple-quoted comment",
-                    line=start_line,
-                    column=start_col,
-                    file_path=self.file_path,
-                    code=ErrorCode.E0104
+    def _scan_string_comment(self, pos: int) -> int:
+        source = self.source
+        if source.startswith('"""', pos):
+            close = source.find('"""', pos + 3)
+            if close == -1:
+                raise self._error(
+                    "Unterminated triple-quoted comment", pos, ErrorCode.E0104
                 )
-            else:
-                # Was just "" - empty string, we already consumed both quotes
-                self._advance()  # consume second "
-                return
-        
-        # Single quoted string comment
-        self._advance()  # opening "
-        while self._current and self._current != '"' and self._current != "\n":
-            self._advance()
-        if self._current == '"':
-            self._advance()  # closing "
-        # If we hit newline, that's fine - single line comment ends
-    
-    def _read_identifier(self) -> str:
-        """Read an identifier or keyword."""
-        start = self._pos
-        while self._current and (self._current.isalnum() or self._current == "_"):
-            self._advance()
-        return self.source[start:self._pos]
+            end = close + 3
+            self._advance_lines(pos, end)
+            return end
+        # Single-quoted comments end at the closing quote or the end of the line
+        line_end = source.find("\n", pos + 1)
+        if line_end == -1:
+            line_end = len(source)
+        close = source.find('"', pos + 1, line_end)
+        return close + 1 if close != -1 else line_end
     
-    def _read_number(self) -> int:
-        """Read a number literal (decimal, hex, or binary)."""
-        start_line, start_col = self._line, self._column
-        
-        if self._current == "0" and self._peek in "xXbB":
-            # Hex or binary
-            self._advance()  # 0
-            prefix = self._advance().lower()  # x or b
-            
-            if prefix == "x":
-                # Hexadecimal
-                start = self._pos
-                while self._current and self._current in "0123456789abcdefABCDEF":
-                    self._advance()
-                if self._pos == start:
-                    raise LexerError(
+    def _scan_number(self, pos: int) -> int:
+        end = _end(_match_number(self.source, pos))
+        text = self.source[pos:end]
+        if end - pos > 1 and text[1] in "xXbB":
+            if end - pos == 2:
+                if text[1] in "xX":
+                    raise self._error(
                         "Invalid hexadecimal number: expected hex digits after '0x'",
-                        line=start_line,
-                        column=start_col,
-                        file_path=self.file_path,
-                        code=ErrorCode.E0105
-                    )
-                return int(self.source[start:self._pos], 16)
-            else:
-                # Binary
-                start = self._pos
-                while self._current in "01":
-                    self._advance()
-                if self._pos == start:
-                    raise LexerError(
-                        "Invalid binary number: expected binary digits (0 or 1) after '0b'",
-                        line=start_line,
-                        column=start_col,
-                        file_path=self.file_path,
-                        code=ErrorCode.E0106
+                        pos, ErrorCode.E0105
                     )
-                return int(self.source[start:self._pos], 2)
+                raise self._error(
+                    "Invalid binary number: expected binary digits (0 or 1) after '0b'",
+                    pos, ErrorCode.E0106
+                )
+            value = int(text, 0)
         else:
-            # Decimal
-            start = self._pos
-            while self._current.isdigit():
-                self._advance()
-            return int(self.source[start:self._pos])
+            # Plain decimals may have leading zeros, which int(text, 0) rejects
+            value = int(text)
+        self._emit(TokenType.NUMBER, value, pos, end)
+        return end
+    
+    def _scan_identifier(self, pos: int) -> int:
+        end = _end(_match_identifier(self.source, pos))
+        text = self.source[pos:end]
+        entry = self._identifiers.get(text)
+        if entry is None:
+            text = sys.intern(text)
+            entry = self._identifiers[text] = (KEYWORDS.get(text, TokenType.IDENTIFIER), text)
+        token_type, value = entry
+        self._emit(token_type, value, pos, end)
+        return end
+    
+    def _scan_punctuation(self, pos: int) -> int:
+        token_type, text = _OPERATOR_ENTRIES[self.source[pos]]
+        self._emit(token_type, text, pos, pos + 1)
+        return pos + 1
+    
+    def _scan_operator(self, pos: int) -> int:
+        """Handle a character that may start a two-character operator."""
+        text = self.source[pos:pos + 2]
+        if text not in ("->", "::"):
+            text = text[:1]
+        end = pos + len(text)
+        token_type, text = _OPERATOR_ENTRIES[text]
+        self._emit(token_type, text, pos, end)
+        return end
+    
+    def _scan_non_ascii(self, pos: int) -> int:
+        """Handle a character outside the ASCII dispatch table."""
+        char = self.source[pos]
+        if char.isdecimal():
+            return self._scan_number(pos)
+        if _match_identifier(char):
+            return self._scan_identifier(pos)
+        raise self._error(f"Unexpected character: {char!r}", pos, ErrorCode.E0101)
     
     def tokenize(self) -> list[Token]:
         """Tokenize the entire source and return a list of tokens."""
+        self._tokens = list(self.iter_tokens())
+        return self._tokens
+    
+    def iter_tokens(self) -> Iterator[Token]:
+        """
+        Tokenize the source lazily, yielding each token as it is scanned.
+        
+        Lexer errors are raised when the offending position is reached, so
+        earlier tokens will already have been produced.
+        """
         self._pos = 0
         self._line = 1
-        self._column = 1
-        self._tokens = []
+        self._line_start = 0  # Offset of the first character of the current line
+        # Scanners emit at most one token each into this buffer
+        buffer: list[Token] = []
+        self._append = buffer.append
+        pop = buffer.pop
+        source = self.source
+        length = len(source)
+        dispatch = _DISPATCH
+        # Indexing bytes yields the code point directly; sources are almost
+        # always ASCII, so only the rare non-ASCII source pays for ord()
+        codes: Sequence[int] = (
+            source.encode("ascii") if source.isascii() else [ord(c) for c in source]
+        )
+        pos = 0
         
-        while self._current:
-            self._skip_whitespace()
-            
-            if not self._current:
-                break
-            
-            start_line, start_col = self._line, self._column
-            char = self._current
-            
-            # Comments
-            if char == "#":
-                self._skip_line_comment()
-                continue
-            
-            if char == '"':
-                self._skip_string_comment()
-                continue
-            
-            # Two-character operators
-            if char == "-" and self._peek == ">":
-                self._advance()
-                self._advance()
-                self._tokens.append(self._make_token(
-                    TokenType.ARROW, "->", start_line, start_col,
-                    self._line, self._column - 1
-                ))
-                continue
-            
-            # Minus sign (standalone, not part of arrow)
-            if char == "-":
-                self._advance()
-                self._tokens.append(self._make_token(
-                    TokenType.MINUS, "-", start_line, start_col
-                ))
-                continue
-            
-            if char == ":" and self._peek == ":":
-                self._advance()
-                self._advance()
-                self._tokens.append(self._make_token(
-                    TokenType.DOUBLE_COLON, "::", start_line, start_col,
-                    self._line, self._column - 1
-                ))
-                continue
-            
-            # Single-character operators
-            single_char_tokens = {
-                ":": TokenType.COLON,
-                ";": TokenType.SEMICOLON,
-                ",": TokenType.COMMA,
-                ".": TokenType.DOT,
-                "=": TokenType.EQUALS,
-                "{": TokenType.LBRACE,
-                "}": TokenType.RBRACE,
-                "[": TokenType.LBRACKET,
-                "]": TokenType.RBRACKET,
-                "(": TokenType.LPAREN,
-                ")": TokenType.RPAREN,
-                ">": TokenType.GREATER,
-                "+": TokenType.PLUS,
-                "*": TokenType.STAR,
-                "/": TokenType.SLASH,
-            }
-            
-            if char in single_char_tokens:
-                self._advance()
-                self._tokens.append(self._make_token(
-                    single_char_tokens[char], char, start_line, start_col
-                ))
-                continue
-            
-            # Identifiers and keywords
-            if char.isalpha() or char == "_":
-                ident = self._read_identifier()
-                token_type = KEYWORDS.get(ident, TokenType.IDENTIFIER)
-                self._tokens.append(self._make_token(
-                    token_type, ident, start_line, start_col,
-                    self._line, self._column - 1
-                ))
-                continue
-            
-            # Numbers
-            if char.isdigit():
-                number = self._read_number()
-                self._tokens.append(self._make_token(
-                    TokenType.NUMBER, number, start_line, start_col,
-                    self._line, self._column - 1
-                ))
-                continue
-            
-            raise LexerError(
-                f"Unexpected character: {char!r}",
-                line=start_line,
-                column=start_col,
-                file_path=self.file_path,
-                code=ErrorCode.E0101
-            )
+        while pos < length:
+            code = codes[pos]
+            scan = dispatch[code] if code < 128 else Lexer._scan_non_ascii
+            if scan is None:
+                raise self._error(
+                    f"Unexpected character: {source[pos]!r}", pos, ErrorCode.E0101
+                )
+            pos = scan(self, pos)
+            if buffer:
+                yield pop()
         
-        self._tokens.append(self._make_token(
-            TokenType.EOF, None, self._line, self._column
-        ))
-        return self._tokens
+        self._pos = pos
+        column = self._pos - self._line_start + 1
+        yield Token(
+            TokenType.EOF, None, self._line, column, self._line, column - 1, self.file_path
+        )
     
     def __iter__(self) -> Iterator[Token]:
         """Iterate over tokens."""
-        return iter(self.tokenize())
+        return self.iter_tokens()
+
+
+def _build_dispatch() -> list[Optional[Callable[[Lexer, int], int]]]:
+    """Map each ASCII code point to the scanner for tokens starting with it."""
+    table: list[Optional[Callable[[Lexer, int], int]]] = [None] * 128
+    for char in " \t\r\n#":
+        table[ord(char)] = Lexer._scan_trivia
+    table[ord('"')] = Lexer._scan_string_comment
+    for code in range(128):
+        char = chr(code)
+        if char.isdigit():
+            table[code] = Lexer._scan_number
+        elif char.isalpha() or char == "_":
+            table[code] = Lexer._scan_identifier
+    for text in _OPERATORS:
+        if len(text) == 1:
+            table[ord(text)] = Lexer._scan_punctuation
+    for text in _OPERATORS:
+        if len(text) == 2:
+            table[ord(text[0])] = Lexer._scan_operator
+    return table
+
+
+# First-character dispatch table, indexed by ord() of the current character
+_DISPATCH = _build_dispatch()
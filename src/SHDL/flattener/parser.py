@@ -5,9 +5,9 @@ Parses a stream of tokens into an Abstract Syntax Tree.
 """
 
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Callable, Optional, List
 
-from .tokens import Token, TokenType
+from .tokens import Token, TokenType, token_mask
 from .lexer import Lexer
 from .ast import (
     Module, Component, Port, Instance, Constant, Connection,
@@ -19,6 +19,18 @@ from ..errors import ParseError as ParseErrorBase, ErrorCode, Suggestion
 from ..source_map import SourceSpan, SourceFile
 
 
+# Token type sets tested in loops, as bitmasks over Parser._bits
+_BLOCK_END = token_mask(TokenType.RBRACE, TokenType.EOF)
+
+# Binding strength of each binary arithmetic operator (0 ends an expression)
+_BINARY_PRECEDENCE: dict[TokenType, int] = {
+    TokenType.PLUS: 1,
+    TokenType.MINUS: 1,
+    TokenType.STAR: 2,
+    TokenType.SLASH: 2,
+}
+
+
 class ParseError(ParseErrorBase):
     """Raised when the parser encounters invalid syntax."""
     
@@ -52,6 +64,12 @@ class Parser:
     
     def __post_init__(self) -> None:
         self._pos: int = 0
+        self._slice_count: int = 0  # Slices parsed so far, used to flag connect blocks
+        # Token types kept in their own column so checks skip the Token lookup
+        self._types: list[TokenType] = [token.type for token in self.tokens]
+        self._bits: list[int] = [1 << token_type.value for token_type in self._types]
+        # Index of the trailing EOF; looking one past any other token stays in range
+        self._last: int = len(self.tokens) - 1
     
     @classmethod
     def from_source(cls, source: str, file_path: str = "<string>") -> "Parser":
@@ -61,62 +79,31 @@ class Parser:
         lexer = Lexer(source, file_path=file_path)
         return cls(lexer.tokenize(), file_path=file_path)
     
-    @property
-    def _current(self) -> Token:
-        """Get the current token."""
-        if self._pos >= len(self.tokens):
-            return self.tokens[-1]  # Return EOF
-        return self.tokens[self._pos]
-    
-    @property
-    def _peek(self) -> Token:
-        """Peek at the next token."""
-        if self._pos + 1 >= len(self.tokens):
-            return self.tokens[-1]
-        return self.tokens[self._pos + 1]
-    
     def _advance(self) -> Token:
         """Advance to the next token and return the current one."""
-        token = self._current
-        self._pos += 1
-        return token
+        pos = self._pos
+        # Never move past EOF, so the current position is always in range
+        if pos < self._last:
+            self._pos = pos + 1
+        return self.tokens[pos]
     
-    def _check(self, *types: TokenType) -> bool:
-        """Check if current token is one of the given types."""
-        return self._current.type in types
+    def _check(self, token_type: TokenType) -> bool:
+        """Check if current token is of the given type."""
+        return self._types[self._pos] is token_type
     
-    def _match(self, *types: TokenType) -> Optional[Token]:
+    def _match(self, token_type: TokenType) -> Optional[Token]:
         """If current token matches, advance and return it. Otherwise return None."""
-        if self._check(*types):
+        if self._types[self._pos] is token_type:
             return self._advance()
         return None
     
     def _expect(self, token_type: TokenType, message: str = "", code: ErrorCode = None) -> Token:
         """Expect a specific token type, raise error if not found."""
-        if self._current.type != token_type:
-            msg = message or f"Expected {token_type.name}, got {self._current.type.name}"
-            raise ParseError(msg, self._current, code=code or ErrorCode.E0201)
+        if self._types[self._pos] is not token_type:
+            msg = message or f"Expected {token_type.name}, got {self._types[self._pos].name}"
+            raise ParseError(msg, self.tokens[self._pos], code=code or ErrorCode.E0201)
         return self._advance()
     
-    def _set_node_location(self, node: Node, start: Token, end: Token = None) -> Node:
-        """Set location information on a node from tokens."""
-        if end is None:
-            end = self.tokens[self._pos - 1] if self._pos > 0 else start
-        
-        node.line = start.line
-        node.column = start.column
-        node.end_line = end.end_line
-        node.end_column = end.end_column
-        node.file_path = start.file_path
-        return node
-    
-    def _make_node(self, node: Node) -> Node:
-        """Set line/column info on a node (legacy method)."""
-        node.line = self._current.line
-        node.column = self._current.column
-        node.file_path = self.file_path
-        return node
-    
     # =========================================================================
     # Top-Level Parsing
     # =========================================================================
@@ -133,15 +120,15 @@ class Parser:
                 components.append(self._parse_component())
             else:
                 raise ParseError(
-                    f"Expected 'use' or 'component', got {self._current.type.name}",
-                    self._current
+                    f"Expected 'use' or 'component', got {self._types[self._pos].name}",
+                    self.tokens[self._pos]
                 )
         
         return Module(imports=imports, components=components)
     
     def _parse_import(self) -> Import:
         """Parse an import statement: use module::{Component1, Component2};"""
-        start = self._current
+        start = self.tokens[self._pos]
         self._expect(TokenType.USE)
         
         module_name = self._expect(TokenType.IDENTIFIER, "Expected module name").value
@@ -161,7 +148,7 @@ class Parser:
     
     def _parse_component(self) -> Component:
         """Parse a component definition."""
-        start = self._current
+        start = self.tokens[self._pos]
         self._expect(TokenType.COMPONENT)
         
         name = self._expect(TokenType.IDENTIFIER, "Expected component name").value
@@ -185,7 +172,7 @@ class Parser:
         instances: list[Node] = []
         connect_block: Optional[ConnectBlock] = None
         
-        while not self._check(TokenType.RBRACE, TokenType.EOF):
+        while not self._bits[self._pos] & _BLOCK_END:
             if self._check(TokenType.CONNECT):
                 connect_block = self._parse_connect_block()
             elif self._check(TokenType.GREATER):
@@ -196,19 +183,18 @@ class Parser:
                 # - IDENTIFIER COLON -> instance declaration
                 # - IDENTIFIER EQUALS -> constant without width
                 # - IDENTIFIER LBRACKET -> constant with width annotation
-                if self._peek.type == TokenType.COLON:
-                    instances.append(self._parse_instance())
-                elif self._peek.type == TokenType.EQUALS or self._peek.type == TokenType.LBRACKET:
-                    instances.append(self._parse_constant())
+                parse_declaration = _DECLARATION_PARSERS.get(self._types[self._pos + 1])
+                if parse_declaration is not None:
+                    instances.append(parse_declaration(self))
                 else:
                     raise ParseError(
                         f"Expected ':', '=' or '[' after identifier",
-                        self._peek
+                        self.tokens[self._pos + 1]
                     )
             else:
                 raise ParseError(
-                    f"Unexpected token in component body: {self._current.type.name}",
-                    self._current
+                    f"Unexpected token in component body: {self._types[self._pos].name}",
+                    self.tokens[self._pos]
                 )
         
         self._expect(TokenType.RBRACE, "Expected '}'")
@@ -239,7 +225,7 @@ class Parser:
     
     def _parse_port(self) -> Port:
         """Parse a single port declaration: Name or Name[width]"""
-        start = self._current
+        start = self.tokens[self._pos]
         name = self._expect(TokenType.IDENTIFIER, "Expected port name").value
         width: Optional[int] = None
         
@@ -251,7 +237,7 @@ class Parser:
     
     def _parse_instance(self) -> Instance:
         """Parse an instance declaration: name: Type;"""
-        start = self._current
+        start = self.tokens[self._pos]
         name = self._expect(TokenType.IDENTIFIER, "Expected instance name").value
         self._expect(TokenType.COLON, "Expected ':'")
         component_type = self._expect(TokenType.IDENTIFIER, "Expected component type").value
@@ -261,7 +247,7 @@ class Parser:
     
     def _parse_generator_instance(self) -> Instance:
         """Parse an instance declaration inside a generator: name{i}: Type;"""
-        start = self._current
+        start = self.tokens[self._pos]
         # Use the same template name parsing as signals
         name = self._parse_template_name()
         self._expect(TokenType.COLON, "Expected ':'")
@@ -277,7 +263,7 @@ class Parser:
     
     def _parse_constant(self) -> Constant:
         """Parse a constant declaration: NAME = value; or NAME[width] = value;"""
-        start = self._current
+        start = self.tokens[self._pos]
         name = self._expect(TokenType.IDENTIFIER, "Expected constant name").value
         
         # Check for optional width annotation
@@ -294,13 +280,14 @@ class Parser:
     
     def _parse_connect_block(self) -> ConnectBlock:
         """Parse a connect block."""
-        start = self._current
+        start = self.tokens[self._pos]
         self._expect(TokenType.CONNECT)
         self._expect(TokenType.LBRACE, "Expected '{'")
         
         statements: list[Node] = []
+        slices_before = self._slice_count
         
-        while not self._check(TokenType.RBRACE, TokenType.EOF):
+        while not self._bits[self._pos] & _BLOCK_END:
             if self._check(TokenType.GREATER):
                 statements.append(self._parse_generator(in_connect=True))
             else:
@@ -308,11 +295,16 @@ class Parser:
         
         self._expect(TokenType.RBRACE, "Expected '}'")
         
-        return ConnectBlock(statements=statements, line=start.line, column=start.column)
+        return ConnectBlock(
+            statements=statements,
+            has_slices=self._slice_count > slices_before,
+            line=start.line,
+            column=start.column
+        )
     
     def _parse_connection(self) -> Connection:
         """Parse a connection: source -> destination;"""
-        start = self._current
+        start = self.tokens[self._pos]
         source = self._parse_signal()
         self._expect(TokenType.ARROW, "Expected '->'")
         destination = self._parse_signal()
@@ -327,24 +319,33 @@ class Parser:
         Returns the raw string with {expr} preserved for later eval.
         Examples: "gate", "gate{i}", "cell{i+1}_{j}"
         """
+        tokens = self.tokens
+        types = self._types
         name = self._expect(TokenType.IDENTIFIER, "Expected identifier").value
-        
-        # Collect any {expr} parts
-        while self._check(TokenType.LBRACE):
-            self._advance()  # consume {
-            # Collect tokens until matching }
-            expr_parts = []
-            while not self._check(TokenType.RBRACE, TokenType.EOF):
-                token = self._advance()
-                expr_parts.append(str(token.value))
+        if types[self._pos] is not TokenType.LBRACE:
+            return name
+        
+        # Collect the name and any {expr} parts, joined once at the end
+        bits = self._bits
+        parts = [name]
+        while types[self._pos] is TokenType.LBRACE:
+            # Scan to the matching } (or EOF) with a local cursor
+            pos = self._pos + 1
+            parts.append("{")
+            while not bits[pos] & _BLOCK_END:
+                value = tokens[pos].value
+                parts.append(value if isinstance(value, str) else str(value))
+                pos += 1
+            self._pos = pos
             self._expect(TokenType.RBRACE, "Expected '}'")
-            name += "{" + "".join(expr_parts) + "}"
+            parts.append("}")
             
             # Check for trailing identifier part (like _suffix)
-            if self._check(TokenType.IDENTIFIER):
-                name += self._advance().value
+            if types[self._pos] is TokenType.IDENTIFIER:
+                parts.append(tokens[self._pos].value)
+                self._pos += 1
         
-        return name
+        return "".join(parts)
     
     def _parse_signal(self) -> Signal:
         """
@@ -359,20 +360,23 @@ class Parser:
             - Name{i} (template)
             - instance{i}.Port
         """
-        start = self._current
+        types = self._types
+        start = self.tokens[self._pos]
         first_name = self._parse_template_name()
         
         instance: Optional[str] = None
         port_name: str = first_name
         
         # Check for instance.port
-        if self._match(TokenType.DOT):
+        if types[self._pos] is TokenType.DOT:
+            self._pos += 1
             instance = first_name
             port_name = self._parse_template_name()
         
         # Check for index
         index: Optional[IndexExpr] = None
-        if self._match(TokenType.LBRACKET):
+        if types[self._pos] is TokenType.LBRACKET:
+            self._pos += 1
             index = self._parse_index_expr()
             self._expect(TokenType.RBRACKET, "Expected ']'")
         
@@ -390,21 +394,26 @@ class Parser:
             - [5:]          slice to end
             - [2:7]         slice range
         """
-        start = self._current
+        types = self._types
+        start = self.tokens[self._pos]
         
         # Check for leading colon (slice from start)
-        if self._match(TokenType.COLON):
+        if types[self._pos] is TokenType.COLON:
+            self._pos += 1
             # [:end]
             end = self._parse_arithmetic_expr()
+            self._slice_count += 1
             return IndexExpr(start=None, end=end, is_slice=True, line=start.line, column=start.column)
         
         # Parse first expression
         first = self._parse_arithmetic_expr()
         
         # Check for colon (slice)
-        if self._match(TokenType.COLON):
+        if types[self._pos] is TokenType.COLON:
+            self._pos += 1
+            self._slice_count += 1
             # Could be [start:] or [start:end]
-            if self._check(TokenType.RBRACKET):
+            if types[self._pos] is TokenType.RBRACKET:
                 # [start:]
                 return IndexExpr(start=first, end=None, is_slice=True, line=start.line, column=start.column)
             else:
@@ -415,39 +424,26 @@ class Parser:
         # Single index
         return IndexExpr(start=first, end=None, is_slice=False, line=start.line, column=start.column)
     
-    def _parse_arithmetic_expr(self) -> ArithmeticExpr:
+    def _parse_arithmetic_expr(self, min_precedence: int = 1) -> ArithmeticExpr:
         """
-        Parse an arithmetic expression.
+        Parse an arithmetic expression by precedence climbing.
         
-        Examples: 5, {i}, {i+1}, {i*2-1}
+        Operators bind at least as tightly as min_precedence and associate
+        to the left. Examples: 5, {i}, {i+1}, {i*2-1}
         """
-        return self._parse_additive_expr()
-    
-    def _parse_additive_expr(self) -> ArithmeticExpr:
-        """Parse addition/subtraction: term (('+' | '-') term)*"""
-        left = self._parse_multiplicative_expr()
-        
-        while self._check(TokenType.PLUS, TokenType.MINUS):
-            op = self._advance().value
-            right = self._parse_multiplicative_expr()
-            left = BinaryOp(left=left, operator=op, right=right, line=left.line, column=left.column)
-        
-        return left
-    
-    def _parse_multiplicative_expr(self) -> ArithmeticExpr:
-        """Parse multiplication/division: primary (('*' | '/') primary)*"""
         left = self._parse_primary_expr()
+        precedence_of = _BINARY_PRECEDENCE.get
         
-        while self._check(TokenType.STAR, TokenType.SLASH):
+        while (precedence := precedence_of(self._types[self._pos], 0)) >= min_precedence:
             op = self._advance().value
-            right = self._parse_primary_expr()
+            right = self._parse_arithmetic_expr(precedence + 1)
             left = BinaryOp(left=left, operator=op, right=right, line=left.line, column=left.column)
         
         return left
     
     def _parse_primary_expr(self) -> ArithmeticExpr:
         """Parse primary expression: number, variable, or {expression}."""
-        start = self._current
+        start = self.tokens[self._pos]
         
         if self._match(TokenType.NUMBER):
             return NumberLiteral(value=start.value, line=start.line, column=start.column)
@@ -457,37 +453,38 @@ class Parser:
         
         if self._match(TokenType.LBRACE):
             # {expression} - parse expression and expect closing brace
-            expr = self._parse_additive_expr()
+            expr = self._parse_arithmetic_expr()
             self._expect(TokenType.RBRACE, "Expected '}'")
             return expr
         
-        raise ParseError("Expected number, variable, or {expression}", self._current)
+        raise ParseError("Expected number, variable, or {expression}", self.tokens[self._pos])
     
     def _parse_generator(self, in_connect: bool) -> Generator:
         """
-        Parse a generator construct.
+        Parse a generator construct, including any generators nested in it.
+        
+        Nested generators are tracked on an explicit stack of the ones still
+        open rather than by recursion.
         
         Example:
             >i[8]{
                 gate{i}: AND;
             }
         """
-        start = self._current
-        self._expect(TokenType.GREATER, "Expected '>'")
-        
-        variable = self._expect(TokenType.IDENTIFIER, "Expected generator variable").value
-        
-        self._expect(TokenType.LBRACKET, "Expected '['")
-        range_spec = self._parse_range_spec()
-        self._expect(TokenType.RBRACKET, "Expected ']'")
-        
-        self._expect(TokenType.LBRACE, "Expected '{'")
-        
-        body: list[Node] = []
-        
-        while not self._check(TokenType.RBRACE, TokenType.EOF):
+        outermost = self._parse_generator_header()
+        open_generators = [outermost]
+        
+        while open_generators:
+            if self._bits[self._pos] & _BLOCK_END:
+                self._expect(TokenType.RBRACE, "Expected '}'")
+                open_generators.pop()
+                continue
+            
+            body = open_generators[-1].body
             if self._check(TokenType.GREATER):
-                body.append(self._parse_generator(in_connect=in_connect))
+                nested = self._parse_generator_header()
+                body.append(nested)
+                open_generators.append(nested)
             elif in_connect:
                 body.append(self._parse_connection())
             else:
@@ -495,20 +492,33 @@ class Parser:
                 # For constants, it's IDENTIFIER EQUALS
                 # For instances, it's IDENTIFIER (possibly with {expr}) COLON
                 if self._check(TokenType.IDENTIFIER):
-                    if self._peek.type == TokenType.EQUALS:
+                    if self._types[self._pos + 1] == TokenType.EQUALS:
                         body.append(self._parse_constant())
                     else:
                         # Could be simple instance (name:) or template instance (name{i}:)
                         body.append(self._parse_generator_instance())
                 else:
-                    raise ParseError("Expected instance or constant declaration", self._current)
+                    raise ParseError("Expected instance or constant declaration", self.tokens[self._pos])
         
-        self._expect(TokenType.RBRACE, "Expected '}'")
+        return outermost
+    
+    def _parse_generator_header(self) -> Generator:
+        """Parse a generator up to its opening brace: >var[range]{"""
+        start = self.tokens[self._pos]
+        self._expect(TokenType.GREATER, "Expected '>'")
+        
+        variable = self._expect(TokenType.IDENTIFIER, "Expected generator variable").value
+        
+        self._expect(TokenType.LBRACKET, "Expected '['")
+        range_spec = self._parse_range_spec()
+        self._expect(TokenType.RBRACKET, "Expected ']'")
+        
+        self._expect(TokenType.LBRACE, "Expected '{'")
         
         return Generator(
             variable=variable,
             range_spec=range_spec,
-            body=body,
+            body=[],
             line=start.line,
             column=start.column
         )
@@ -535,7 +545,7 @@ class Parser:
     
     def _parse_single_range(self) -> RangeSpec:
         """Parse a single range item."""
-        start = self._current
+        start = self.tokens[self._pos]
         
         # Check for [:end] (leading colon)
         if self._match(TokenType.COLON):
@@ -557,6 +567,14 @@ class Parser:
         return SimpleRange(end=first_num, line=start.line, column=start.column)
 
 
+# Declaration parser for each token that may follow an identifier in a component body
+_DECLARATION_PARSERS: dict[TokenType, Callable[[Parser], Node]] = {
+    TokenType.COLON: Parser._parse_instance,
+    TokenType.EQUALS: Parser._parse_constant,
+    TokenType.LBRACKET: Parser._parse_constant,
+}
+
+
 def parse(source: str, file_path: str = "<string>") -> Module:
     """Parse SHDL source code into an AST."""
     parser = Parser.from_source(source, file_path=file_path)
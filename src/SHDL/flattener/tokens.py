@@ -4,12 +4,11 @@ SHDL Token Definitions
 Defines all token types used by the SHDL lexer.
 """
 
+from dataclasses import FrozenInstanceError
 from enum import Enum, auto
-from dataclasses import dataclass
-from typing import Any, Optional, TYPE_CHECKING
+from typing import Any, Optional
 
-if TYPE_CHECKING:
-    from ..source_map import SourceSpan
+from ..source_map import SourceSpan
 
 
 class TokenType(Enum):
@@ -51,30 +50,85 @@ class TokenType(Enum):
     NEWLINE = auto()
 
 
-@dataclass(frozen=True)
 class Token:
     """
     A single token from the SHDL source.
     
     Includes both start and end positions for precise error reporting.
+    End positions that aren't given are derived from the start and the
+    value only when first read, since they are only needed for errors.
+    Tokens are immutable, like the frozen dataclass they replace.
     """
     
+    __slots__ = ("type", "value", "line", "column", "_end_line", "_end_column", "file_path")
+    
     type: TokenType
     value: Any
     line: int
     column: int
-    end_line: int = None  # type: ignore
-    end_column: int = None  # type: ignore
-    file_path: str = "<string>"
-    
-    def __post_init__(self):
-        # Handle default end positions
-        if self.end_line is None:
-            object.__setattr__(self, 'end_line', self.line)
-        if self.end_column is None:
+    _end_line: Optional[int]
+    _end_column: Optional[int]
+    file_path: str
+    
+    def __init__(
+        self,
+        type: TokenType,
+        value: Any,
+        line: int,
+        column: int,
+        end_line: Optional[int] = None,
+        end_column: Optional[int] = None,
+        file_path: str = "<string>"
+    ) -> None:
+        _set = object.__setattr__
+        _set(self, "type", type)
+        _set(self, "value", value)
+        _set(self, "line", line)
+        _set(self, "column", column)
+        _set(self, "_end_line", end_line)
+        _set(self, "_end_column", end_column)
+        _set(self, "file_path", file_path)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise FrozenInstanceError(f"cannot assign to field '{name}'")
+    
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field '{name}'")
+    
+    def __reduce__(self) -> tuple:
+        # The default slot-state restore would go through __setattr__
+        return (Token, (
+            self.type, self.value, self.line, self.column,
+            self._end_line, self._end_column, self.file_path
+        ))
+    
+    @property
+    def end_line(self) -> int:
+        """Line of the token's last character."""
+        return self.line if self._end_line is None else self._end_line
+    
+    @property
+    def end_column(self) -> int:
+        """Column of the token's last character."""
+        if self._end_column is None:
             # Default end column based on value length
             value_len = len(str(self.value)) if self.value is not None else 1
-            object.__setattr__(self, 'end_column', self.column + value_len - 1)
+            return self.column + value_len - 1
+        return self._end_column
+    
+    def _key(self) -> tuple:
+        return (
+            self.type, self.value, self.line, self.column,
+            self.end_line, self.end_column, self.file_path
+        )
+    
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not Token:
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self) -> int:
+        return hash(self._key())
     
     def __repr__(self) -> str:
         return f"Token({self.type.name}, {self.value!r}, {self.line}:{self.column})"
@@ -82,7 +136,6 @@ class Token:
     @property
     def span(self) -> "SourceSpan":
         """Get the source span for this token."""
-        from ..source_map import SourceSpan
         return SourceSpan(
             file_path=self.file_path,
             start_line=self.line,
@@ -104,6 +157,14 @@ class Token:
         )
 
 
+def token_mask(*types: TokenType) -> int:
+    """Build a bitmask with one bit per token type, for membership tests with &."""
+    mask = 0
+    for token_type in types:
+        mask |= 1 << token_type.value
+    return mask
+
+
 # Keyword mapping
 KEYWORDS: dict[str, TokenType] = {
     "component": TokenType.COMPONENT,
@@ -4,15 +4,18 @@ SHDL Semantic Analyzer
 Main driver for semantic analysis. Runs all checks in the correct order.
 """
 
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Optional, List, Set
+from typing import Optional, List, Set, Iterable, Tuple
+import hashlib
+import os
 
 from ..flattener.ast import Module, Component
 from ..source_map import SourceSpan, SourceFile
 from ..errors import (
-    DiagnosticCollection, Diagnostic, ValidationError, SemanticError
+    DiagnosticCollection, Diagnostic, ValidationError, SemanticError, ErrorCode
 )
-from .resolver import ComponentResolver, SymbolTable, build_symbol_table
+from .resolver import ComponentResolver, SymbolTable, build_symbol_table, clear_module_cache
 from .type_check import TypeChecker
 from .connection import ConnectionChecker
 from .warnings import WarningChecker, check_unused_imports
@@ -110,8 +113,7 @@ class SemanticAnalyzer:
         self.symbol_tables[component.name] = table
         
         # Track used components
-        for inst in table.instances.values():
-            self._used_components.add(inst.component_type)
+        self._used_components |= table.component_types
         
         # Type checking (validate widths)
         type_checker = TypeChecker(
@@ -136,11 +138,38 @@ class SemanticAnalyzer:
             warn_checker.check_component(component)
 
 
+# Recent analyze() results, most recently used last. Each entry keeps the
+# (path, mtime, size) of the module files it imported, and of the missing
+# candidate paths searched before them, to detect edits and new files.
+_RESULT_CACHE: "OrderedDict[tuple, tuple[AnalysisResult, tuple]]" = OrderedDict()
+_RESULT_CACHE_SIZE = 32
+
+
+def clear_cache() -> None:
+    """Forget all cached analysis results and parsed modules."""
+    _RESULT_CACHE.clear()
+    clear_module_cache()
+
+
+def _file_stamps(paths: Iterable[str]) -> tuple:
+    """Get (path, mtime, size) for each file; a missing file gets (path, None, None)."""
+    stamps: List[Tuple[str, Optional[int], Optional[int]]] = []
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stamps.append((path, None, None))
+        else:
+            stamps.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(stamps)
+
+
 def analyze(
     source: str,
     file_path: str = "<string>",
     search_paths: List[str] = None,
-    enable_warnings: bool = True
+    enable_warnings: bool = True,
+    use_cache: bool = False
 ) -> AnalysisResult:
     """
     Analyze SHDL source code.
@@ -150,18 +179,22 @@ def analyze(
         file_path: Path for error reporting
         search_paths: Directories to search for imports
         enable_warnings: Whether to report warnings
+        use_cache: Reuse the result of an earlier identical call
     
     Returns:
         AnalysisResult with diagnostics and symbol information
+    
+    With use_cache, results are cached by source text and options, and
+    reused while the module files they imported are unchanged and no
+    module file has appeared earlier in the search order. A cached result
+    is the same object for every call that reuses it, so callers opting in
+    must treat it as read-only. Without it, every call gets a fresh result.
     """
     from ..flattener.parser import parse
     
     # Register source for error messages
     SourceFile.register(file_path, source)
     
-    # Parse
-    module = parse(source, file_path=file_path)
-    
     # Determine search paths
     paths = search_paths or ["."]
     if file_path != "<string>":
@@ -170,19 +203,47 @@ def analyze(
         if file_dir not in paths:
             paths = [file_dir] + paths
     
+    # Relative paths are keyed absolutely, so a change of working
+    # directory doesn't reuse results resolved against the old one
+    key = (
+        hashlib.blake2b(source.encode(), digest_size=16).digest(),
+        file_path if file_path == "<string>" else os.path.abspath(file_path),
+        tuple(os.path.abspath(p) for p in paths),
+        enable_warnings
+    )
+    cached = _RESULT_CACHE.get(key) if use_cache else None
+    if cached is not None:
+        result, stamps = cached
+        if _file_stamps(path for path, _, _ in stamps) == stamps:
+            _RESULT_CACHE.move_to_end(key)
+            return result
+    
+    # Parse
+    module = parse(source, file_path=file_path)
+    
     # Analyze
     analyzer = SemanticAnalyzer(
         search_paths=paths,
         enable_warnings=enable_warnings
     )
+    result = analyzer.analyze(module)
     
-    return analyzer.analyze(module)
+    # A module that can't be found now may appear later, so don't cache that
+    if use_cache and not any(d.code == ErrorCode.E0701 for d in result.diagnostics.diagnostics):
+        resolver = analyzer.resolver
+        stamps = _file_stamps(resolver.imported_files | resolver.probed_files)
+        _RESULT_CACHE[key] = (result, stamps)
+        if len(_RESULT_CACHE) > _RESULT_CACHE_SIZE:
+            _RESULT_CACHE.popitem(last=False)
+    
+    return result
 
 
 def analyze_file(
     path: str,
     search_paths: List[str] = None,
-    enable_warnings: bool = True
+    enable_warnings: bool = True,
+    use_cache: bool = False
 ) -> AnalysisResult:
     """
     Analyze an SHDL file.
@@ -191,18 +252,24 @@ def analyze_file(
         path: Path to the SHDL file
         search_paths: Additional directories to search for imports
         enable_warnings: Whether to report warnings
+        use_cache: Reuse the result of an earlier identical call (see analyze)
     
     Returns:
         AnalysisResult with diagnostics and symbol information
     """
-    with open(path, 'r') as f:
-        source = f.read()
+    # Read bytes and decode once, rather than through the text layer's
+    # incremental decoder; newlines are then translated as text mode would
+    with open(path, 'rb') as f:
+        source = f.read().decode('utf-8')
+    if '\r' in source:
+        source = source.replace('\r\n', '\n').replace('\r', '\n')
     
     return analyze(
         source=source,
         file_path=path,
         search_paths=search_paths,
-        enable_warnings=enable_warnings
+        enable_warnings=enable_warnings,
+        use_cache=use_cache
     )
 
 
@@ -9,11 +9,11 @@ Validates connection completeness and correctness:
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, Set, List, Optional, Tuple
-from collections import defaultdict
+from typing import Dict, Set, List, Optional, Tuple, Union
+import sys
 
 from ..flattener.ast import (
-    Component, Connection, Signal, Generator, ConnectBlock, Node
+    Component, Connection, Signal, ConnectBlock, Node
 )
 from ..source_map import SourceSpan
 from ..errors import (
@@ -21,13 +21,49 @@ from ..errors import (
     Annotation, Suggestion, RelatedInfo
 )
 from .resolver import SymbolTable, InstanceInfo, SignalInfo
+from .generators import walk_generators
 
 
-@dataclass
+# A normalized signal: base name ("Name" or "inst.Port") and bit index, if any
+SignalKey = Tuple[str, Optional[int]]
+
+
+def _display_name(signal: SignalKey) -> str:
+    """Format a normalized signal as written in source, e.g. "inst.A[3]"."""
+    base, index = signal
+    return base if index is None else f"{base}[{index}]"
+
+
+@dataclass(slots=True)
 class ConnectionInfo:
     """Information about a connection endpoint."""
-    span: SourceSpan
-    full_name: str  # e.g., "inst.A" or "PortName[3]"
+    node: Signal  # The endpoint as written; its span is only built when needed
+    signal: SignalKey  # e.g., ("inst.A", None) or ("PortName", 3)
+    
+    @property
+    def span(self) -> SourceSpan:
+        """Source span of the endpoint."""
+        return self.node.span
+    
+    @property
+    def full_name(self) -> str:
+        """The endpoint's name as written in source, e.g. "PortName[3]"."""
+        return _display_name(self.signal)
+
+
+# One endpoint, or a list of them once a second one is recorded
+Endpoints = Union[ConnectionInfo, List[ConnectionInfo]]
+
+
+def _add_endpoint(table: Dict[SignalKey, Endpoints], signal: SignalKey, info: ConnectionInfo) -> None:
+    """Record an endpoint for a signal, only allocating a list for the second one."""
+    existing = table.get(signal)
+    if existing is None:
+        table[signal] = info
+    elif isinstance(existing, list):
+        existing.append(info)
+    else:
+        table[signal] = [existing, info]
 
 
 class ConnectionChecker:
@@ -50,11 +86,8 @@ class ConnectionChecker:
         self.table = symbol_table
         
         # Track what drives each signal/port
-        # Key: normalized signal name, Value: list of drivers
-        self._drivers: Dict[str, List[ConnectionInfo]] = defaultdict(list)
-        
-        # Track what each signal is connected to (as destination)
-        self._connections: Dict[str, List[ConnectionInfo]] = defaultdict(list)
+        # Key: normalized signal, Value: the driver, or a list once there are several
+        self._drivers: Dict[SignalKey, Endpoints] = {}
         
         # Track which instance ports have been connected
         self._connected_instance_inputs: Set[str] = set()  # "inst.port"
@@ -62,9 +95,16 @@ class ConnectionChecker:
         
         # Track which component output ports are driven
         self._driven_outputs: Set[str] = set()
+        self._output_ports: frozenset = frozenset()  # Set by check_component
+        
+        # Substituted template names, keyed by (template, generator bindings)
+        self._substituted: Dict[Tuple[str, tuple], str] = {}
     
     def check_component(self, component: Component) -> None:
         """Check all connections in a component."""
+        # Snapshot the port names tested for every recorded connection
+        self._output_ports = frozenset(self.table.output_ports)
+        
         # First pass: collect all connections
         if component.connect_block:
             self._collect_connections(component.connect_block, {})
@@ -72,49 +112,26 @@ class ConnectionChecker:
         # Check for multiply-driven signals
         self._check_multiply_driven()
         
-        # Check that all instance inputs are connected
-        self._check_instance_inputs()
+        # Check that all instance inputs are connected, noting unused outputs
+        unconnected_outputs = self._check_instance_ports()
         
         # Check that all component outputs are driven
         self._check_output_ports(component)
         
         # Warn about unconnected instance outputs
-        self._warn_unconnected_outputs()
+        self._warn_unconnected_outputs(unconnected_outputs)
     
     def _collect_connections(
         self,
         block: ConnectBlock,
         gen_vars: Dict[str, int]
     ) -> None:
-        """Collect all connections from a connect block."""
-        for node in block.statements:
+        """Collect all connections from a connect block, including generators."""
+        def visit(node: Node) -> None:
             if isinstance(node, Connection):
                 self._record_connection(node, gen_vars)
-            elif isinstance(node, Generator):
-                self._collect_generator_connections(node, gen_vars)
-    
-    def _collect_generator_connections(
-        self,
-        gen: Generator,
-        outer_vars: Dict[str, int]
-    ) -> None:
-        """Collect connections from a generator."""
-        from ..flattener.flattener import expand_range
-        
-        try:
-            values = expand_range(gen.range_spec)
-        except Exception:
-            return  # Error already reported
         
-        for val in values:
-            new_vars = dict(outer_vars)
-            new_vars[gen.variable] = val
-            
-            for node in gen.body:
-                if isinstance(node, Connection):
-                    self._record_connection(node, new_vars)
-                elif isinstance(node, Generator):
-                    self._collect_generator_connections(node, new_vars)
+        walk_generators(block.statements, gen_vars, visit)
     
     def _record_connection(
         self,
@@ -122,67 +139,84 @@ class ConnectionChecker:
         gen_vars: Dict[str, int]
     ) -> None:
         """Record a single connection."""
-        src_name = self._normalize_signal(conn.source, gen_vars)
-        dst_name = self._normalize_signal(conn.destination, gen_vars)
+        src = self._normalize_signal(conn.source, gen_vars)
+        dst = self._normalize_signal(conn.destination, gen_vars)
         
-        if src_name is None or dst_name is None:
+        if src is None or dst is None:
             return  # Error already reported
         
-        src_info = ConnectionInfo(span=conn.source.span, full_name=src_name)
-        dst_info = ConnectionInfo(span=conn.destination.span, full_name=dst_name)
-        
         # Record that dst is driven by src
-        self._drivers[dst_name].append(src_info)
-        self._connections[src_name].append(dst_info)
+        _add_endpoint(self._drivers, dst, ConnectionInfo(node=conn.source, signal=src))
         
-        # Track instance port connections
-        if "." in dst_name:
-            base = dst_name.split("[")[0]  # Remove index if present
-            self._connected_instance_inputs.add(base)
+        # Track instance port connections (by port, whatever the bit)
+        src_base = src[0]
+        dst_base = dst[0]
+        if "." in dst_base:
+            self._connected_instance_inputs.add(dst_base)
         
-        if "." in src_name:
-            base = src_name.split("[")[0]
-            self._connected_instance_outputs.add(base)
+        if "." in src_base:
+            self._connected_instance_outputs.add(src_base)
         
         # Track component output driving
-        dst_base = dst_name.split("[")[0]
-        if dst_base in self.table.output_ports:
+        if dst_base in self._output_ports:
             self._driven_outputs.add(dst_base)
     
     def _normalize_signal(
         self,
         signal: Signal,
         gen_vars: Dict[str, int]
-    ) -> Optional[str]:
+    ) -> Optional[SignalKey]:
         """
-        Create a normalized string name for a signal.
+        Normalize a signal to its base name and bit index.
         
-        Returns: "name", "name[idx]", "inst.port", or "inst.port[idx]"
+        The base is "name" or "inst.port"; the index is None for whole
+        signals and slices. Returns None if the index can't be evaluated.
         """
-        from ..flattener.flattener import substitute_name, evaluate_expr
+        from ..flattener.flattener import evaluate_expr
         
-        name = substitute_name(signal.name, gen_vars)
-        instance = substitute_name(signal.instance, gen_vars) if signal.instance else None
+        name = self._substitute(signal.name, gen_vars)
+        instance = self._substitute(signal.instance, gen_vars) if signal.instance else None
         
         if instance:
-            base = f"{instance}.{name}"
+            # Interned so repeated endpoints share one key object in the
+            # driver and port tables; plain names already come shared from
+            # the lexer or the substitution cache
+            base = sys.intern(f"{instance}.{name}")
         else:
             base = name
         
         if signal.index and not signal.index.is_slice:
             if signal.index.start is not None:
                 try:
-                    idx = evaluate_expr(signal.index.start, gen_vars)
-                    return f"{base}[{idx}]"
+                    return (base, evaluate_expr(signal.index.start, gen_vars))
                 except Exception:
                     return None
         
-        return base
+        return (base, None)
+    
+    def _substitute(self, template: str, gen_vars: Dict[str, int]) -> str:
+        """
+        Substitute generator variables into a name, reusing earlier results.
+        
+        The same template is usually substituted with the same bindings by
+        several signals (e.g. "gate{i}" as both a source and a destination),
+        and names without placeholders need no substitution at all.
+        """
+        if "{" not in template:
+            return template
+        
+        key = (template, tuple(gen_vars.items()))
+        name = self._substituted.get(key)
+        if name is None:
+            from ..flattener.flattener import substitute_name
+            name = self._substituted[key] = substitute_name(template, gen_vars)
+        return name
     
     def _check_multiply_driven(self) -> None:
         """Check for signals driven by multiple sources."""
-        for signal_name, drivers in self._drivers.items():
-            if len(drivers) > 1:
+        for signal, drivers in self._drivers.items():
+            # Single drivers are stored bare; only multiply-driven signals have lists
+            if isinstance(drivers, list):
                 primary = drivers[0]
                 related = [
                     RelatedInfo(
@@ -194,7 +228,7 @@ class ConnectionChecker:
                 
                 self.diagnostics.error(
                     code=ErrorCode.E0503,
-                    message=f"Signal '{signal_name}' is driven by multiple sources",
+                    message=f"Signal '{_display_name(signal)}' is driven by multiple sources",
                     span=primary.span,
                     annotations=[Annotation(
                         span=primary.span,
@@ -203,59 +237,48 @@ class ConnectionChecker:
                     related=related
                 )
     
-    def _check_instance_inputs(self) -> None:
-        """Check that all instance input ports are connected."""
+    def _check_instance_ports(self) -> List[Tuple[str, str, SourceSpan]]:
+        """
+        Check that all instance input ports are connected.
+        
+        Connections are recorded per port with any bit index stripped, so a
+        vector port counts as connected once any of its bits is. Outputs are
+        checked in the same pass over the instances; the unconnected ones
+        are returned as (instance, port, span) so their warnings can follow
+        the errors.
+        """
+        connected_inputs = self._connected_instance_inputs
+        connected_outputs = self._connected_instance_outputs
+        unconnected_outputs: List[Tuple[str, str, SourceSpan]] = []
+        
         for inst_name, inst_info in self.table.instances.items():
-            if inst_info.component is None:
+            component = inst_info.component
+            if component is None:
                 continue  # Component not resolved
             
-            for port in inst_info.component.inputs:
+            for port in component.inputs:
                 full_name = f"{inst_name}.{port.name}"
-                
-                if port.width:
-                    # Vector port - check each bit
-                    all_connected = True
-                    for i in range(1, port.width + 1):
-                        bit_name = f"{full_name}[{i}]"
-                        if bit_name not in self._connected_instance_inputs and full_name not in self._connected_instance_inputs:
-                            all_connected = False
-                            break
-                    
-                    if not all_connected and full_name not in self._connected_instance_inputs:
-                        self.diagnostics.error(
-                            code=ErrorCode.E0501,
-                            message=f"Missing connection to input port '{port.name}' of instance '{inst_name}'",
-                            span=inst_info.span,
-                            suggestions=[Suggestion(
-                                message=f"add connection: ... -> {full_name};"
-                            )]
-                        )
-                else:
-                    # Single-bit port
-                    if full_name not in self._connected_instance_inputs:
-                        self.diagnostics.error(
-                            code=ErrorCode.E0501,
-                            message=f"Missing connection to input port '{port.name}' of instance '{inst_name}'",
-                            span=inst_info.span,
-                            suggestions=[Suggestion(
-                                message=f"add connection: ... -> {full_name};"
-                            )]
-                        )
+                if full_name not in connected_inputs:
+                    self.diagnostics.error(
+                        code=ErrorCode.E0501,
+                        message=f"Missing connection to input port '{port.name}' of instance '{inst_name}'",
+                        span=inst_info.span,
+                        suggestions=[Suggestion(
+                            message=f"add connection: ... -> {full_name};"
+                        )]
+                    )
+            
+            for port in component.outputs:
+                if f"{inst_name}.{port.name}" not in connected_outputs:
+                    unconnected_outputs.append((inst_name, port.name, inst_info.span))
+        
+        return unconnected_outputs
     
     def _check_output_ports(self, component: Component) -> None:
         """Check that all component output ports are driven."""
+        # Driving any bit of an output port records the whole port as driven
         for port in component.outputs:
             if port.name not in self._driven_outputs:
-                # Check if any bits are driven for vector ports
-                if port.width:
-                    any_driven = False
-                    for i in range(1, port.width + 1):
-                        if f"{port.name}[{i}]" in self._drivers:
-                            any_driven = True
-                            break
-                    if any_driven:
-                        continue
-                
                 self.diagnostics.error(
                     code=ErrorCode.E0502,
                     message=f"Output port '{port.name}' is never driven",
@@ -265,28 +288,15 @@ class ConnectionChecker:
                     )]
                 )
     
-    def _warn_unconnected_outputs(self) -> None:
+    def _warn_unconnected_outputs(
+        self,
+        unconnected_outputs: List[Tuple[str, str, SourceSpan]]
+    ) -> None:
         """Warn about unconnected instance outputs (potential dead code)."""
-        for inst_name, inst_info in self.table.instances.items():
-            if inst_info.component is None:
-                continue
-            
-            for port in inst_info.component.outputs:
-                full_name = f"{inst_name}.{port.name}"
-                
-                if full_name not in self._connected_instance_outputs:
-                    # Check individual bits for vector outputs
-                    any_connected = False
-                    if port.width:
-                        for i in range(1, port.width + 1):
-                            if f"{full_name}[{i}]" in self._connections:
-                                any_connected = True
-                                break
-                    
-                    if not any_connected:
-                        self.diagnostics.warning(
-                            code=ErrorCode.W0107,
-                            message=f"Output '{port.name}' of instance '{inst_name}' is not connected",
-                            span=inst_info.span,
-                            notes=["this may indicate dead code"]
-                        )
+        for inst_name, port_name, span in unconnected_outputs:
+            self.diagnostics.warning(
+                code=ErrorCode.W0107,
+                message=f"Output '{port_name}' of instance '{inst_name}' is not connected",
+                span=span,
+                notes=["this may indicate dead code"]
+            )
@@ -0,0 +1,85 @@
+"""
+SHDL Generator Walking
+
+Shared traversal of generator bodies for the semantic passes. Generator
+variables are bound in a single dict in place, instead of copying the
+bindings for every value, and nesting is walked with an explicit stack.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from ..flattener.ast import Generator, Node
+
+
+@dataclass(slots=True)
+class _GeneratorFrame:
+    """An open generator: its remaining values and the rest of its body."""
+    generator: Generator
+    values: Iterator[int]
+    body: Iterator[Node]
+    outer: Optional[int]  # Binding of the variable outside this generator
+
+
+def quiet_generator_values(gen: Generator) -> Optional[Sequence[int]]:
+    """Expand a generator's range, or None if it is invalid (reported elsewhere)."""
+    from ..flattener.flattener import generator_values
+
+    try:
+        return generator_values(gen)
+    except Exception:
+        return None
+
+
+def walk_generators(
+    nodes: Iterable[Node],
+    gen_vars: Dict[str, int],
+    visit: Callable[[Node], None],
+    expand: Callable[[Generator], Optional[Sequence[int]]] = quiet_generator_values
+) -> None:
+    """
+    Visit nodes in order, descending into generators once per value.
+
+    visit is called for every node that is not a generator, with gen_vars
+    holding the bindings of all enclosing generators. expand gives a
+    generator's values when it is reached, or None to skip it. Each
+    generator restores any outer binding of its variable when it finishes,
+    so gen_vars is unchanged on return.
+    """
+    stack: List[_GeneratorFrame] = []
+    top = iter(nodes)
+
+    while True:
+        if stack:
+            frame = stack[-1]
+            node = next(frame.body, None)
+            if node is None:
+                # Body finished for this value - move on to the next one
+                variable = frame.generator.variable
+                value = next(frame.values, None)
+                if value is None:
+                    stack.pop()
+                    if frame.outer is None:
+                        gen_vars.pop(variable, None)
+                    else:
+                        gen_vars[variable] = frame.outer
+                else:
+                    gen_vars[variable] = value
+                    frame.body = iter(frame.generator.body)
+                continue
+        else:
+            node = next(top, None)
+            if node is None:
+                return
+
+        if isinstance(node, Generator):
+            values = expand(node)
+            if values:
+                stack.append(_GeneratorFrame(
+                    generator=node,
+                    values=iter(values),
+                    body=iter(()),
+                    outer=gen_vars.get(node.variable)
+                ))
+        else:
+            visit(node)
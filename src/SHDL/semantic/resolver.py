@@ -5,9 +5,12 @@ Handles name resolution for components, signals, and instances.
 Provides "did you mean?" suggestions for typos.
 """
 
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Optional, Dict, List, Set
+from typing import Optional, Dict, List, Set, FrozenSet, Sequence, Tuple
 from pathlib import Path
+import heapq
+import os
 
 from ..flattener.ast import (
     Module, Component, Port, Instance, Constant, Connection,
@@ -19,13 +22,45 @@ from ..errors import (
     Annotation, Suggestion, RelatedInfo,
     find_similar
 )
+from .generators import walk_generators
 
 
 # Primitive gates built into SHDL
-PRIMITIVE_GATES = {"AND", "OR", "NOT", "XOR", "__VCC__", "__GND__"}
+PRIMITIVE_GATES = frozenset({"AND", "OR", "NOT", "XOR", "__VCC__", "__GND__"})
 
+# Span shared by all builtin definitions
+_BUILTIN_SPAN = SourceSpan(file_path="<builtin>")
 
-@dataclass
+# Recently parsed module files by resolved path, most recently used last,
+# with the (mtime, size) they were parsed at
+_MODULE_CACHE: "OrderedDict[str, Tuple[Tuple[int, int], Module]]" = OrderedDict()
+_MODULE_CACHE_SIZE = 64
+
+
+def _parse_module(path: str) -> Module:
+    """Parse a module file, reusing the last parse if the file is unchanged."""
+    from ..flattener.parser import parse_file
+    
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _MODULE_CACHE.get(path)
+    if cached is not None and cached[0] == stamp:
+        _MODULE_CACHE.move_to_end(path)
+        return cached[1]
+    
+    module = parse_file(path)
+    _MODULE_CACHE[path] = (stamp, module)
+    if len(_MODULE_CACHE) > _MODULE_CACHE_SIZE:
+        _MODULE_CACHE.popitem(last=False)
+    return module
+
+
+def clear_module_cache() -> None:
+    """Forget all parsed module files."""
+    _MODULE_CACHE.clear()
+
+
+@dataclass(slots=True)
 class ComponentInfo:
     """Information about a component type."""
     name: str
@@ -35,6 +70,22 @@ class ComponentInfo:
     is_primitive: bool = False
     source_file: str = "<builtin>"
     
+    # Port lookup tables, built once from inputs/outputs
+    _port_map: Dict[str, Port] = field(init=False, repr=False, compare=False)
+    _input_names: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    _output_names: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    port_names: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    port_names_joined: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        port_map = {p.name: p for p in reversed(self.outputs)}
+        port_map.update((p.name, p) for p in reversed(self.inputs))
+        self._port_map = port_map
+        self._input_names = frozenset(p.name for p in self.inputs)
+        self._output_names = frozenset(p.name for p in self.outputs)
+        self.port_names = tuple(p.name for p in self.inputs + self.outputs)
+        self.port_names_joined = ", ".join(self.port_names)
+    
     @classmethod
     def from_primitive(cls, name: str) -> "ComponentInfo":
         """Create ComponentInfo for a primitive gate."""
@@ -52,7 +103,7 @@ class ComponentInfo:
             name=name,
             inputs=inputs,
             outputs=outputs,
-            span=SourceSpan(file_path="<builtin>"),
+            span=_BUILTIN_SPAN,
             is_primitive=True,
             source_file="<builtin>"
         )
@@ -71,21 +122,24 @@ class ComponentInfo:
     
     def get_port(self, name: str) -> Optional[Port]:
         """Get a port by name."""
-        for p in self.inputs + self.outputs:
-            if p.name == name:
-                return p
-        return None
+        return self._port_map.get(name)
     
     def is_input_port(self, name: str) -> bool:
         """Check if a port name is an input port."""
-        return any(p.name == name for p in self.inputs)
+        return name in self._input_names
     
     def is_output_port(self, name: str) -> bool:
         """Check if a port name is an output port."""
-        return any(p.name == name for p in self.outputs)
+        return name in self._output_names
+
 
+# ComponentInfo for each primitive gate, shared by all resolvers
+_PRIMITIVE_INFOS: Dict[str, ComponentInfo] = {
+    name: ComponentInfo.from_primitive(name) for name in sorted(PRIMITIVE_GATES)
+}
 
-@dataclass
+
+@dataclass(slots=True)
 class InstanceInfo:
     """Information about an instance."""
     name: str
@@ -100,7 +154,7 @@ class InstanceInfo:
         return None
 
 
-@dataclass
+@dataclass(slots=True)
 class SignalInfo:
     """Information about a signal (port or internal wire)."""
     name: str
@@ -114,7 +168,7 @@ class SignalInfo:
         return self.width if self.width is not None else 1
 
 
-@dataclass
+@dataclass(slots=True)
 class ConstantInfo:
     """Information about a constant."""
     name: str
@@ -123,7 +177,7 @@ class ConstantInfo:
     span: SourceSpan
 
 
-@dataclass
+@dataclass(slots=True)
 class SymbolTable:
     """
     Symbol table for a single component scope.
@@ -141,8 +195,16 @@ class SymbolTable:
     input_ports: Set[str] = field(default_factory=set)
     output_ports: Set[str] = field(default_factory=set)
     
-    def add_port(self, port: Port, is_input: bool) -> None:
-        """Add a port to the symbol table."""
+    # Component types of all instances, for unused-import checks
+    component_types: Set[str] = field(default_factory=set)
+    
+    def add_port(self, port: Port, is_input: bool) -> Optional[SignalInfo]:
+        """
+        Add a port to the symbol table.
+        
+        Returns the previously defined signal if the name is taken,
+        leaving the table unchanged, or None if the port was added.
+        """
         info = SignalInfo(
             name=port.name,
             width=port.width,
@@ -150,35 +212,55 @@ class SymbolTable:
             is_output=not is_input,
             span=port.span
         )
-        self.signals[port.name] = info
+        existing = self.signals.setdefault(port.name, info)
+        if existing is not info:
+            return existing
         if is_input:
             self.input_ports.add(port.name)
         else:
             self.output_ports.add(port.name)
+        return None
     
     def add_instance(
         self,
         instance: Instance,
         component: Optional[ComponentInfo]
-    ) -> None:
-        """Add an instance to the symbol table."""
+    ) -> Optional[InstanceInfo]:
+        """
+        Add an instance to the symbol table.
+        
+        Returns the previously defined instance if the name is taken,
+        leaving the table unchanged, or None if the instance was added.
+        """
         info = InstanceInfo(
             name=instance.name,
             component_type=instance.component_type,
             component=component,
             span=instance.span
         )
-        self.instances[instance.name] = info
+        existing = self.instances.setdefault(instance.name, info)
+        if existing is not info:
+            return existing
+        self.component_types.add(instance.component_type)
+        return None
     
-    def add_constant(self, const: Constant) -> None:
-        """Add a constant to the symbol table."""
+    def add_constant(self, const: Constant) -> Optional[ConstantInfo]:
+        """
+        Add a constant to the symbol table.
+        
+        Returns the previously defined constant if the name is taken,
+        leaving the table unchanged, or None if the constant was added.
+        """
         info = ConstantInfo(
             name=const.name,
             value=const.value,
             width=const.width,
             span=const.span
         )
-        self.constants[const.name] = info
+        existing = self.constants.setdefault(const.name, info)
+        if existing is not info:
+            return existing
+        return None
     
     def lookup_signal(self, name: str) -> Optional[SignalInfo]:
         """Look up a signal by name."""
@@ -224,9 +306,24 @@ class ComponentResolver:
         self._import_stack: List[str] = []
         self._imported_files: Set[str] = set()
         
+        # Candidate module paths that were looked for but did not exist
+        self._probed_files: Set[str] = set()
+        
+        # Parsed modules by path (None if loading failed), and the
+        # (path, component) pairs registered from them so far
+        self._modules: Dict[str, Optional[Module]] = {}
+        self._registered: Set[Tuple[str, str]] = set()
+        
         # Add primitive gates
-        for name in PRIMITIVE_GATES:
-            self._components[name] = ComponentInfo.from_primitive(name)
+        self._components.update(_PRIMITIVE_INFOS)
+        
+        # Suggestion memo for unknown names, valid while the component
+        # set is unchanged; register_component bumps the version
+        self._components_version = 0
+        self._suggest_cache: Dict[str, List[str]] = {}
+        self._component_names: Optional[List[str]] = None
+        self._available_note: Optional[str] = None
+        self._suggest_version = 0
     
     def register_component(self, comp: Component) -> None:
         """Register a component from the AST."""
@@ -245,6 +342,7 @@ class ComponentResolver:
                 return
         
         self._components[comp.name] = ComponentInfo.from_component(comp)
+        self._components_version += 1
     
     def resolve(self, name: str, span: SourceSpan) -> Optional[ComponentInfo]:
         """
@@ -257,11 +355,26 @@ class ComponentResolver:
             return self._components[name]
         
         # Component not found - suggest similar names
-        available = list(self._components.keys())
-        similar = find_similar(name, available, max_distance=2)
+        if self._suggest_version != self._components_version:
+            self._suggest_cache.clear()
+            self._component_names = None
+            self._available_note = None
+            self._suggest_version = self._components_version
+        
+        if self._component_names is None:
+            self._component_names = list(self._components)
+        
+        similar = self._suggest_cache.get(name)
+        if similar is None:
+            similar = find_similar(name, self._component_names, max_distance=2)
+            self._suggest_cache[name] = similar
+        
+        if self._available_note is None:
+            available = heapq.nsmallest(10, self._component_names)
+            self._available_note = f"available components: {', '.join(available)}"
         
         suggestions = []
-        notes = [f"available components: {', '.join(sorted(available)[:10])}"]
+        notes = [self._available_note]
         
         if similar:
             suggestions.append(Suggestion(
@@ -312,14 +425,14 @@ class ComponentResolver:
             )
             return
         
-        # Load the module (avoid re-loading)
-        if module_path not in self._imported_files:
-            self._import_stack.append(module_path)
-            try:
-                self._load_module(module_path, imp)
-            finally:
-                self._import_stack.pop()
-            self._imported_files.add(module_path)
+        # Load the module; a file is parsed once, and later imports from it
+        # only register the components they ask for
+        self._import_stack.append(module_path)
+        try:
+            self._load_module(module_path, imp)
+        finally:
+            self._import_stack.pop()
+        self._imported_files.add(module_path)
         
         # Check that requested components exist
         for comp_name in imp.components:
@@ -338,27 +451,44 @@ class ComponentResolver:
             path = Path(search_path) / filename
             if path.exists():
                 return str(path.resolve())
+            self._probed_files.add(os.path.abspath(path))
         
         return None
     
     def _load_module(self, path: str, imp: Import) -> None:
         """Load components from a module file."""
-        from ..flattener.parser import parse_file
+        if path in self._modules:
+            module = self._modules[path]
+            if module is None:
+                return  # Loading failed, error already reported
+        else:
+            try:
+                module = _parse_module(path)
+            except Exception as e:
+                self._modules[path] = None
+                self.diagnostics.error(
+                    code=ErrorCode.E0704,
+                    message=f"Error loading module '{imp.module}': {e}",
+                    span=imp.span
+                )
+                return
+            self._modules[path] = module
         
-        try:
-            module = parse_file(path)
-            
-            # Only register the components that were imported
-            for comp in module.components:
-                if comp.name in imp.components:
-                    self.register_component(comp)
-                    
-        except Exception as e:
-            self.diagnostics.error(
-                code=ErrorCode.E0704,
-                message=f"Error loading module '{imp.module}': {e}",
-                span=imp.span
-            )
+        # Only register the components that were imported
+        for comp in module.components:
+            if comp.name in imp.components and (path, comp.name) not in self._registered:
+                self._registered.add((path, comp.name))
+                self.register_component(comp)
+    
+    @property
+    def imported_files(self) -> Set[str]:
+        """Resolved paths of the module files loaded so far."""
+        return self._imported_files
+    
+    @property
+    def probed_files(self) -> Set[str]:
+        """Absolute candidate module paths that were searched but missing."""
+        return self._probed_files
     
     @property
     def available_components(self) -> List[str]:
@@ -385,33 +515,31 @@ def build_symbol_table(
     
     # Add input ports
     for port in component.inputs:
-        if port.name in table.signals:
+        existing = table.add_port(port, is_input=True)
+        if existing is not None:
             diagnostics.error(
                 code=ErrorCode.E0305,
                 message=f"Duplicate port name '{port.name}'",
                 span=port.span,
                 related=[RelatedInfo(
-                    span=table.signals[port.name].span,
+                    span=existing.span,
                     message="first defined here"
                 )]
             )
-        else:
-            table.add_port(port, is_input=True)
     
     # Add output ports
     for port in component.outputs:
-        if port.name in table.signals:
+        existing = table.add_port(port, is_input=False)
+        if existing is not None:
             diagnostics.error(
                 code=ErrorCode.E0305,
                 message=f"Duplicate port name '{port.name}'",
                 span=port.span,
                 related=[RelatedInfo(
-                    span=table.signals[port.name].span,
+                    span=existing.span,
                     message="first defined here"
                 )]
             )
-        else:
-            table.add_port(port, is_input=False)
     
     # Process instances and constants (including from generators)
     _process_declarations(component.instances, table, resolver, diagnostics, {})
@@ -426,45 +554,51 @@ def _process_declarations(
     diagnostics: DiagnosticCollection,
     gen_vars: Dict[str, int]
 ) -> None:
-    """Process declarations recursively (handling generators)."""
-    for node in nodes:
+    """
+    Process declarations, including those inside generators.
+    
+    Generator ranges are validated as each generator is reached; invalid
+    or empty ones are reported and their bodies skipped.
+    """
+    from ..flattener.flattener import generator_values
+    
+    def expand(gen: Generator) -> Optional[Sequence[int]]:
+        # Validate generator range
+        try:
+            values = generator_values(gen)
+        except Exception as e:
+            diagnostics.error(
+                code=ErrorCode.E0601,
+                message=f"Invalid generator range: {e}",
+                span=gen.span
+            )
+            return None
+        
+        if not values:
+            diagnostics.error(
+                code=ErrorCode.E0605,
+                message=f"Empty generator range",
+                span=gen.span
+            )
+            return None
+        
+        # Check for shadowing
+        if gen.variable in gen_vars:
+            diagnostics.error(
+                code=ErrorCode.E0606,
+                message=f"Generator variable '{gen.variable}' shadows outer variable",
+                span=gen.span
+            )
+        
+        return values
+    
+    def visit(node: Node) -> None:
         if isinstance(node, Instance):
             _process_instance(node, table, resolver, diagnostics, gen_vars)
         elif isinstance(node, Constant):
             _process_constant(node, table, diagnostics, gen_vars)
-        elif isinstance(node, Generator):
-            # Validate generator range
-            from ..flattener.flattener import expand_range
-            try:
-                values = expand_range(node.range_spec)
-                if not values:
-                    diagnostics.error(
-                        code=ErrorCode.E0605,
-                        message=f"Empty generator range",
-                        span=node.span
-                    )
-                    continue
-                
-                # Check for shadowing
-                if node.variable in gen_vars:
-                    diagnostics.error(
-                        code=ErrorCode.E0606,
-                        message=f"Generator variable '{node.variable}' shadows outer variable",
-                        span=node.span
-                    )
-                
-                # Process body for each value
-                for val in values:
-                    new_vars = dict(gen_vars)
-                    new_vars[node.variable] = val
-                    _process_declarations(node.body, table, resolver, diagnostics, new_vars)
-                    
-            except Exception as e:
-                diagnostics.error(
-                    code=ErrorCode.E0601,
-                    message=f"Invalid generator range: {e}",
-                    span=node.span
-                )
+    
+    walk_generators(nodes, gen_vars, visit, expand)
 
 
 def _process_instance(
@@ -476,17 +610,32 @@ def _process_instance(
 ) -> None:
     """Process a single instance declaration."""
     # Substitute generator variables in name
-    from ..flattener.flattener import substitute_name
-    name = substitute_name(inst.name, gen_vars)
+    name = inst.name
+    if "{" in name:
+        from ..flattener.flattener import substitute_name
+        name = substitute_name(name, gen_vars)
     
-    # Check for duplicate
-    if name in table.instances:
+    # Create modified instance with resolved name
+    resolved_inst = Instance(
+        name=name,
+        component_type=inst.component_type,
+        line=inst.line,
+        column=inst.column,
+        end_line=inst.end_line,
+        end_column=inst.end_column,
+        file_path=inst.file_path
+    )
+    
+    # Register it, checking for a duplicate in the same probe; the
+    # component is filled in once resolved below
+    existing = table.add_instance(resolved_inst, None)
+    if existing is not None:
         diagnostics.error(
             code=ErrorCode.E0305,
             message=f"Duplicate instance name '{name}'",
             span=inst.span,
             related=[RelatedInfo(
-                span=table.instances[name].span,
+                span=existing.span,
                 message="first defined here"
             )]
         )
@@ -505,20 +654,7 @@ def _process_instance(
         )
     
     # Resolve component type
-    comp_info = resolver.resolve(inst.component_type, inst.span)
-    
-    # Create modified instance with resolved name
-    resolved_inst = Instance(
-        name=name,
-        component_type=inst.component_type,
-        line=inst.line,
-        column=inst.column,
-        end_line=inst.end_line,
-        end_column=inst.end_column,
-        file_path=inst.file_path
-    )
-    
-    table.add_instance(resolved_inst, comp_info)
+    table.instances[name].component = resolver.resolve(inst.component_type, inst.span)
 
 
 def _process_constant(
@@ -528,17 +664,20 @@ def _process_constant(
     gen_vars: Dict[str, int]
 ) -> None:
     """Process a single constant declaration."""
-    from ..flattener.flattener import substitute_name
-    name = substitute_name(const.name, gen_vars)
+    name = const.name
+    if "{" in name:
+        from ..flattener.flattener import substitute_name
+        name = substitute_name(name, gen_vars)
     
     # Check for duplicate
-    if name in table.constants:
+    existing = table.constants.get(name)
+    if existing is not None:
         diagnostics.error(
             code=ErrorCode.E0306,
             message=f"Duplicate constant name '{name}'",
             span=const.span,
             related=[RelatedInfo(
-                span=table.constants[name].span,
+                span=existing.span,
                 message="first defined here"
             )]
         )
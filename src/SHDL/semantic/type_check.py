@@ -10,7 +10,7 @@ from typing import Optional, Dict, List, Tuple
 from ..flattener.ast import (
     Component, Port, Connection, Signal, IndexExpr,
     ArithmeticExpr, NumberLiteral, VariableRef, BinaryOp,
-    Generator, ConnectBlock, Node
+    ConnectBlock, Node
 )
 from ..source_map import SourceSpan
 from ..errors import (
@@ -18,11 +18,17 @@ from ..errors import (
     Annotation, Suggestion, RelatedInfo
 )
 from .resolver import SymbolTable, ComponentInfo, InstanceInfo, SignalInfo
+from .generators import walk_generators
 
 
-@dataclass
+@dataclass(slots=True)
 class WidthInfo:
-    """Information about the width of a signal reference."""
+    """
+    Information about the width of a signal reference.
+    
+    The checker itself works with plain int widths; this type is kept
+    because it is exported from SHDL.semantic as public API.
+    """
     width: int  # Number of bits
     is_single_bit: bool  # True if accessing a single bit via subscript
     span: SourceSpan
@@ -54,6 +60,10 @@ class TypeChecker:
     ):
         self.diagnostics = diagnostics
         self.table = symbol_table
+        
+        # Base widths of resolved (instance, name) references; generator
+        # bodies look up the same signals once per iteration
+        self._base_widths: Dict[Tuple[Optional[str], str], int] = {}
     
     def check_component(self, component: Component) -> None:
         """Check all connections in a component."""
@@ -65,36 +75,13 @@ class TypeChecker:
         block: ConnectBlock,
         gen_vars: Dict[str, int]
     ) -> None:
-        """Check all connections in a connect block."""
-        for node in block.statements:
+        """Check all connections in a connect block, including generators."""
+        def visit(node: Node) -> None:
             if isinstance(node, Connection):
                 self._check_connection(node, gen_vars)
-            elif isinstance(node, Generator):
-                self._check_generator_connections(node, gen_vars)
-    
-    def _check_generator_connections(
-        self,
-        gen: Generator,
-        outer_vars: Dict[str, int]
-    ) -> None:
-        """Check connections inside a generator."""
-        from ..flattener.flattener import expand_range
-        
-        try:
-            values = expand_range(gen.range_spec)
-        except Exception:
-            # Generator error already reported by resolver
-            return
         
-        for val in values:
-            new_vars = dict(outer_vars)
-            new_vars[gen.variable] = val
-            
-            for node in gen.body:
-                if isinstance(node, Connection):
-                    self._check_connection(node, new_vars)
-                elif isinstance(node, Generator):
-                    self._check_generator_connections(node, new_vars)
+        # Invalid generator ranges were already reported by the resolver
+        walk_generators(block.statements, gen_vars, visit)
     
     def _check_connection(
         self,
@@ -102,28 +89,28 @@ class TypeChecker:
         gen_vars: Dict[str, int]
     ) -> None:
         """Check a single connection."""
-        src_width = self._get_signal_width(conn.source, gen_vars)
-        dst_width = self._get_signal_width(conn.destination, gen_vars)
+        src_width = self._signal_width(conn.source, gen_vars)
+        dst_width = self._signal_width(conn.destination, gen_vars)
         
         if src_width is None or dst_width is None:
             # Error already reported
             return
         
-        if src_width.width != dst_width.width:
+        if src_width != dst_width:
             self.diagnostics.error(
                 code=ErrorCode.E0401,
-                message=f"Port width mismatch in connection: {src_width.width} bits vs {dst_width.width} bits",
+                message=f"Port width mismatch in connection: {src_width} bits vs {dst_width} bits",
                 span=conn.span,
                 annotations=[
                     Annotation(
-                        span=src_width.span,
-                        label=f"this is {src_width.width} bit(s) wide"
+                        span=conn.source.span,
+                        label=f"this is {src_width} bit(s) wide"
                     )
                 ],
                 related=[
                     RelatedInfo(
-                        span=dst_width.span,
-                        message=f"target is {dst_width.width} bit(s) wide"
+                        span=conn.destination.span,
+                        message=f"target is {dst_width} bit(s) wide"
                     )
                 ],
                 suggestions=[
@@ -133,22 +120,52 @@ class TypeChecker:
                 ]
             )
     
-    def _get_signal_width(
+    def _signal_width(
         self,
         signal: Signal,
         gen_vars: Dict[str, int]
-    ) -> Optional[WidthInfo]:
+    ) -> Optional[int]:
         """
-        Determine the width of a signal reference.
+        Determine the bit count of a signal reference, after any index
+        or slice is applied.
         
         Returns None if the signal is invalid (error already reported).
         """
-        from ..flattener.flattener import substitute_name, evaluate_expr
+        from ..flattener.flattener import substitute_name
         
         # Resolve template names
-        name = substitute_name(signal.name, gen_vars)
-        instance = substitute_name(signal.instance, gen_vars) if signal.instance else None
+        name = signal.name
+        if "{" in name:
+            name = substitute_name(name, gen_vars)
+        instance = signal.instance or None
+        if instance and "{" in instance:
+            instance = substitute_name(instance, gen_vars)
+        
+        key = (instance, name)
+        base_width = self._base_widths.get(key)
+        if base_width is None:
+            base_width = self._resolve_base_width(signal, name, instance)
+            if base_width is None:
+                return None
+            self._base_widths[key] = base_width
+        
+        # Handle indexing/slicing
+        if signal.index:
+            return self._apply_index(signal.index, base_width, signal.span, gen_vars)
         
+        return base_width
+    
+    def _resolve_base_width(
+        self,
+        signal: Signal,
+        name: str,
+        instance: Optional[str]
+    ) -> Optional[int]:
+        """
+        Look up the unindexed width of a resolved signal reference.
+        
+        Returns None if the reference is invalid (error reported).
+        """
         if instance:
             # Instance port reference: inst.Port
             inst_info = self.table.lookup_instance(instance)
@@ -167,12 +184,11 @@ class TypeChecker:
             
             port = inst_info.component.get_port(name)
             if port is None:
-                available_ports = [p.name for p in inst_info.component.inputs + inst_info.component.outputs]
                 self.diagnostics.error(
                     code=ErrorCode.E0304,
                     message=f"Unknown port '{name}' on component '{inst_info.component_type}'",
                     span=signal.span,
-                    notes=[f"available ports: {', '.join(available_ports)}"]
+                    notes=[f"available ports: {inst_info.component.port_names_joined}"]
                 )
                 return None
             
@@ -200,11 +216,7 @@ class TypeChecker:
                 )
                 return None
         
-        # Handle indexing/slicing
-        if signal.index:
-            return self._apply_index(signal.index, base_width, signal.span, gen_vars)
-        
-        return WidthInfo.multi_bit(base_width, signal.span)
+        return base_width
     
     def _apply_index(
         self,
@@ -212,8 +224,8 @@ class TypeChecker:
         base_width: int,
         span: SourceSpan,
         gen_vars: Dict[str, int]
-    ) -> Optional[WidthInfo]:
-        """Apply an index or slice to a base width."""
+    ) -> Optional[int]:
+        """Apply an index or slice to a base width, giving the resulting width."""
         from ..flattener.flattener import evaluate_expr
         
         if index.is_slice:
@@ -221,27 +233,27 @@ class TypeChecker:
             start = 1
             end = base_width
             
-            if index.start is not None:
-                try:
+            # Literal bounds (the common case) need no evaluation; one
+            # handler covers both bounds, with `bound` naming the failing one
+            bound = "start"
+            try:
+                if isinstance(index.start, NumberLiteral):
+                    start = index.start.value
+                elif index.start is not None:
                     start = evaluate_expr(index.start, gen_vars)
-                except Exception as e:
-                    self.diagnostics.error(
-                        code=ErrorCode.E0603,
-                        message=f"Invalid slice start expression: {e}",
-                        span=span
-                    )
-                    return None
-            
-            if index.end is not None:
-                try:
+                
+                bound = "end"
+                if isinstance(index.end, NumberLiteral):
+                    end = index.end.value
+                elif index.end is not None:
                     end = evaluate_expr(index.end, gen_vars)
-                except Exception as e:
-                    self.diagnostics.error(
-                        code=ErrorCode.E0603,
-                        message=f"Invalid slice end expression: {e}",
-                        span=span
-                    )
-                    return None
+            except Exception as e:
+                self.diagnostics.error(
+                    code=ErrorCode.E0603,
+                    message=f"Invalid slice {bound} expression: {e}",
+                    span=span
+                )
+                return None
             
             # Validate range
             if start < 1 or end > base_width:
@@ -260,8 +272,7 @@ class TypeChecker:
                 )
                 return None
             
-            slice_width = end - start + 1
-            return WidthInfo.multi_bit(slice_width, span)
+            return end - start + 1
         
         else:
             # Single index: [n]
@@ -273,15 +284,18 @@ class TypeChecker:
                 )
                 return None
             
-            try:
-                idx = evaluate_expr(index.start, gen_vars)
-            except Exception as e:
-                self.diagnostics.error(
-                    code=ErrorCode.E0603,
-                    message=f"Invalid index expression: {e}",
-                    span=span
-                )
-                return None
+            if isinstance(index.start, NumberLiteral):
+                idx = index.start.value
+            else:
+                try:
+                    idx = evaluate_expr(index.start, gen_vars)
+                except Exception as e:
+                    self.diagnostics.error(
+                        code=ErrorCode.E0603,
+                        message=f"Invalid index expression: {e}",
+                        span=span
+                    )
+                    return None
             
             # Validate index
             if idx < 1 or idx > base_width:
@@ -296,7 +310,7 @@ class TypeChecker:
                 # Subscripting a single-bit signal is technically allowed
                 pass
             
-            return WidthInfo.single_bit(span)
+            return 1
     
     def _suggest_instance(self, name: str) -> List[Suggestion]:
         """Suggest similar instance names."""
@@ -92,12 +92,14 @@ class WarningChecker:
         outer_vars: Dict[str, int]
     ) -> None:
         """Collect usage from a generator."""
-        from ..flattener.flattener import expand_range
+        from ..flattener.flattener import generator_values
         
         try:
-            values = expand_range(gen.range_spec)
+            values = generator_values(gen)
         except Exception:
             return
+        if not values:
+            return  # Empty range - nothing to walk
         
         for val in values:
             new_vars = dict(outer_vars)
@@ -128,7 +128,44 @@ class TestNameResolutionErrors:
         # Should suggest 'AND' for 'ANd'
         formatted = error.format()
         assert "AND" in formatted or "available components" in formatted
-    
+
+    def test_E0301_repeated_unknown_name_keeps_suggestions(self):
+        """Test that every repeat of an unknown name gets the same help."""
+        result = analyze("""
+            component Test(A) -> (B) {
+                >i[3] {
+                    g{i}: ANd;
+                }
+                connect {
+                    A -> g1.A;
+                    g1.O -> B;
+                }
+            }
+        """)
+
+        errors = [d for d in result.diagnostics.diagnostics if d.code == ErrorCode.E0301]
+        assert len(errors) == 3
+        for error in errors:
+            assert [s.message for s in error.suggestions][0] == "did you mean 'AND'?"
+            assert error.notes == errors[0].notes
+
+    def test_E0301_suggestion_tie_break(self):
+        """Test that equally close names are ranked deterministically."""
+        result = analyze("""
+            component Test(A) -> (B) {
+                gate1: NOR;
+                connect {
+                    A -> gate1.A;
+                    gate1.O -> B;
+                }
+            }
+        """)
+
+        errors = [d for d in result.diagnostics.diagnostics if d.code == ErrorCode.E0301]
+        assert len(errors) == 1
+        # OR, NOT and XOR are all one edit away; OR only drops a character
+        assert errors[0].suggestions[0].message == "did you mean 'OR'?"
+
     def test_E0302_undefined_signal(self):
         """Test E0302: Undefined signal."""
         result = analyze("""
@@ -677,3 +714,85 @@ class TestIntegration:
         assert result.has_errors
         # Should detect: unknown component, duplicate instance, width mismatch, etc.
         assert result.diagnostics.error_count >= 3
+    
+    def test_analyze_reuses_results(self, tmp_path):
+        """Test that opted-in results are cached until the source or its imports change."""
+        (tmp_path / "lib.shdl").write_text(
+            "component Buf(A) -> (O) { connect { A -> O; } }"
+        )
+        source = """
+            use lib::{Buf};
+            component Top(A) -> (O) {
+                b: Buf;
+                connect { A -> b.A; b.O -> O; }
+            }
+        """
+        first = analyze(source, search_paths=[str(tmp_path)], use_cache=True)
+        assert not first.has_errors
+        assert analyze(source, search_paths=[str(tmp_path)], use_cache=True) is first
+        
+        # Without use_cache every call gets its own result
+        assert analyze(source, search_paths=[str(tmp_path)]) is not first
+        
+        # Editing the imported module invalidates the cached result
+        (tmp_path / "lib.shdl").write_text(
+            "component Buf(In) -> (O) { connect { In -> O; } }"
+        )
+        second = analyze(source, search_paths=[str(tmp_path)], use_cache=True)
+        assert second is not first
+        assert second.has_errors
+    
+    def test_separate_imports_from_one_module(self, tmp_path):
+        """Test that a second import from a loaded module registers its components."""
+        (tmp_path / "lib.shdl").write_text(
+            "component Buf(A) -> (O) { connect { A -> O; } }\n"
+            "component Inv(A) -> (O) { n: NOT; connect { A -> n.A; n.O -> O; } }\n"
+        )
+        result = analyze("""
+            use lib::{Buf};
+            use lib::{Inv};
+            component Top(A) -> (O) {
+                b: Buf;
+                i: Inv;
+                connect { A -> b.A; b.O -> i.A; i.O -> O; }
+            }
+        """, search_paths=[str(tmp_path)], use_cache=True)
+        
+        assert not result.has_errors
+    
+    def test_analyze_cache_follows_search_paths(self, tmp_path, monkeypatch):
+        """Test that cached results track the working directory and new modules."""
+        (tmp_path / "a").mkdir()
+        (tmp_path / "b").mkdir()
+        (tmp_path / "a" / "m.shdl").write_text(
+            "component M(A) -> (O) { connect { A -> O; } }"
+        )
+        (tmp_path / "b" / "m.shdl").write_text(
+            "component N(A) -> (O) { connect { A -> O; } }"
+        )
+        source = """
+            use m::{M};
+            component Top(A) -> (O) {
+                m: M;
+                connect { A -> m.A; m.O -> O; }
+            }
+        """
+        
+        # The default "." search path resolves against the working directory
+        monkeypatch.chdir(tmp_path / "a")
+        assert not analyze(source, use_cache=True).has_errors
+        monkeypatch.chdir(tmp_path / "b")
+        codes = {d.code for d in analyze(source, use_cache=True).diagnostics.diagnostics}
+        assert ErrorCode.E0702 in codes
+        
+        # A module appearing earlier in the search order is picked up
+        (tmp_path / "c").mkdir()
+        paths = [str(tmp_path / "c"), str(tmp_path / "a")]
+        first = analyze(source, search_paths=paths, use_cache=True)
+        assert not first.has_errors
+        (tmp_path / "c" / "m.shdl").write_text(
+            "component N(A) -> (O) { connect { A -> O; } }"
+        )
+        second = analyze(source, search_paths=paths, use_cache=True)
+        assert second is not first
+        assert second.has_errors
@@ -90,6 +90,30 @@ class TestLexer:
         lines = [t.line for t in tokens[:-1]]
         assert lines == [1, 2, 3]
 
+    def test_token_stream(self):
+        """Test lazy token iteration."""
+        source = 'a -> b; """x\ny""" c'
+        stream = Lexer(source).iter_tokens()
+
+        assert next(stream).value == "a"
+        assert list(stream) == Lexer(source).tokenize()[1:]
+
+        stream = Lexer("ok @").iter_tokens()
+        assert next(stream).value == "ok"
+        with pytest.raises(LexerError):
+            next(stream)
+
+    def test_tokens_are_immutable(self):
+        """Test that tokens can't be changed after lexing."""
+        token = Lexer("abc").tokenize()[0]
+
+        with pytest.raises(AttributeError):
+            token.line = 5
+        with pytest.raises(AttributeError):
+            del token.value
+        assert token.end_column == 3
+        assert hash(token) == hash(Lexer("abc").tokenize()[0])
+
 
 # =============================================================================
 # Parser Tests
@@ -215,6 +239,26 @@ class TestParser:
         gens = [n for n in comp.instances if isinstance(n, Generator)]
         assert len(gens) == 2
 
+    def test_index_arithmetic_precedence(self):
+        """Test that index arithmetic binds * over - and associates left."""
+        source = '''
+        component Test(A[8]) -> (B) {
+            connect {
+                A[{i-j*2-1}] -> B;
+            }
+        }
+        '''
+        module = parse(source)
+        conn = module.components[0].connect_block.statements[0]
+        expr = conn.source.index.start
+
+        # ((i - (j * 2)) - 1)
+        assert expr.operator == "-"
+        assert expr.right.value == 1
+        assert expr.left.operator == "-"
+        assert expr.left.left.name == "i"
+        assert expr.left.right.operator == "*"
+
 
 # =============================================================================
 # Flattener Tests
@@ -333,6 +377,123 @@ class TestFlattener:
         assert "component Simple(A, B) -> (O)" in result
         assert "and1: AND;" in result
         assert "A -> and1.A;" in result
+    
+    def test_module_cache(self, tmp_path):
+        """Test that imported modules are parsed once and reused from cache_dir."""
+        (tmp_path / "gates.shdl").write_text('''
+        component Buf(A) -> (O) {
+            or1: OR;
+            connect {
+                A -> or1.A;
+                A -> or1.B;
+                or1.O -> O;
+            }
+        }
+        ''')
+        (tmp_path / "top.shdl").write_text('''
+        use gates::{Buf};
+        
+        component Top(X) -> (Y) {
+            b1: Buf;
+            connect {
+                X -> b1.A;
+                b1.O -> Y;
+            }
+        }
+        ''')
+        cache_dir = tmp_path / "cache"
+        
+        results = []
+        for _ in range(2):
+            flattener = Flattener(search_paths=[str(tmp_path)], cache_dir=str(cache_dir))
+            flattener.load_file(str(tmp_path / "top.shdl"))
+            results.append(flattener.flatten_to_base_shdl("Top"))
+        
+        assert len(list(cache_dir.glob("*.pkl"))) == 2
+        assert results[0] == results[1]
+        assert "b1_or1: OR;" in results[0]
+
+    def test_module_cache_ignores_foreign_entries(self, tmp_path):
+        """Test that a cache entry holding something other than a Module is reparsed."""
+        import pickle
+        path = tmp_path / "simple.shdl"
+        path.write_text("component Simple(A) -> (O) { n1: NOT; connect { A -> n1.A; n1.O -> O; } }")
+        cache_dir = tmp_path / "cache"
+        Flattener(cache_dir=str(cache_dir)).load_file(str(path))
+        (entry,) = cache_dir.glob("*.pkl")
+        entry.write_bytes(pickle.dumps({"not": "a module"}))
+
+        flattener = Flattener(cache_dir=str(cache_dir))
+        flattener.load_file(str(path))
+        assert "n1: NOT;" in flattener.flatten_to_base_shdl("Simple")
+        assert isinstance(pickle.loads(entry.read_bytes()), Module)
+
+    def test_load_file_reuses_parse(self, tmp_path):
+        """Test that an unchanged file is parsed once per Flattener."""
+        path = tmp_path / "simple.shdl"
+        path.write_text("component Simple(A) -> (O) { n1: NOT; connect { A -> n1.A; n1.O -> O; } }")
+
+        flattener = Flattener()
+        first = flattener.load_file(str(path))
+        assert flattener.load_file(str(path)) is first
+
+        path.write_text("component Simple(A, B) -> (O) { connect { A -> O; } }")
+        assert flattener.load_file(str(path)) is not first
+
+    def test_flatten_reuses_results(self):
+        """Test that repeated flattens are memoized until the library changes."""
+        source = '''
+        component Simple(A, B) -> (O) {
+            and1: AND;
+            connect {
+                A -> and1.A;
+                B -> and1.B;
+                and1.O -> O;
+            }
+        }
+        '''
+        flattener = Flattener()
+        flattener.load_source(source)
+        first = flattener.flatten("Simple")
+        assert flattener.flatten("Simple") is first
+
+        flattener.load_source(source.replace("AND", "OR"))
+        result = flattener.flatten("Simple")
+        assert result is not first
+        assert [n.component_type for n in result.instances] == ["OR"]
+
+    def test_flatten_result_is_shared(self):
+        """Test that every caller of one flattener gets the same Component."""
+        source = '''
+        component Inner(A) -> (O) {
+            n: NOT;
+            connect {
+                A -> n.A;
+                n.O -> O;
+            }
+        }
+
+        component Outer(A) -> (O) {
+            i: Inner;
+            connect {
+                A -> i.A;
+                i.O -> O;
+            }
+        }
+        '''
+        flattener = Flattener()
+        flattener.load_source(source)
+        outer = flattener.flatten("Outer")
+        inner = flattener.flatten("Inner")
+
+        # Both are reused from the memo, not rebuilt
+        assert flattener.flatten("Outer") is outer
+        assert flattener.flatten("Inner") is inner
+        assert flattener.flatten_to_base_shdl("Outer") == format_base_shdl(outer)
+
+        other = Flattener()
+        other.load_source(source)
+        assert other.flatten("Outer") is not outer
 
 
 # =============================================================================